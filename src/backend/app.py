@@ -1,11 +1,40 @@
 from importlib import reload
-from fastapi import FastAPI, HTTPException
+from fastapi import APIRouter, FastAPI, Header, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
+from fastapi.responses import JSONResponse, PlainTextResponse, Response
+from fastapi.routing import APIRoute
+from pydantic import BaseModel, model_validator
 from pathlib import Path
+from typing import List, Optional
+import numpy as np
 import pandas as pd
-import pickle
+import functools
+import json
 import logging
+import operator
+import os
+import sys
+
+# Make the project root importable for the shared src.* modules
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from src.data.imputer import MedianImputer
+from src.models.forest_format import (
+    DEFAULT_DECISION_THRESHOLD,
+    DEFAULT_VECTORIZED_MAX_ROWS,
+    column_order,
+    decision_threshold,
+    load_artifact,
+    model_input,
+    threshold_predictions,
+)
+from batching import MicroBatcher
+from executor import InferenceExecutor
+from cache import PredictionCache, parse_quantization
+from registry import ModelRegistry, ModelVersion, ReloadInProgress, artifact_fingerprint
+from streaming import DuplexStreamingResponse, StreamFormatError, format_results, iter_row_chunks, stream_format
+from wire_formats import CONTENT_TYPES, WireFormatError, decode_rows, encode_predictions, request_format, response_format
+from metrics import SIZE_BUCKETS, MetricsMiddleware, MetricsRegistry, PhaseTimer, process_rss_bytes
 
 # ==============================================================
 # Logging Setup
@@ -25,6 +54,86 @@ app = FastAPI(
     ),
 )
 
+# ==============================================================
+# Configuration
+# ==============================================================
+# Feature order used when the model was trained
+FEATURES = [
+    "ph",
+    "Hardness",
+    "Solids",
+    "Chloramines",
+    "Sulfate",
+    "Conductivity",
+    "Organic_carbon",
+    "Trihalomethanes",
+    "Turbidity",
+]
+
+# Upper bound on the number of samples accepted by the batch routes
+MAX_BATCH_SIZE = int(os.getenv("MAX_BATCH_SIZE", "10000"))
+
+# Rows parsed and scored per model call on the streaming route
+STREAM_CHUNK_ROWS = int(os.getenv("STREAM_CHUNK_ROWS", "4096"))
+
+# Micro-batching of concurrent /predict calls
+BATCH_MAX_SIZE = int(os.getenv("BATCH_MAX_SIZE", "64"))
+BATCH_MAX_WAIT_MS = float(os.getenv("BATCH_MAX_WAIT_MS", "5"))
+
+# Where model inference runs: "thread" or "process" pool
+INFERENCE_EXECUTOR = os.getenv("INFERENCE_EXECUTOR", "thread")
+INFERENCE_WORKERS = int(os.getenv("INFERENCE_WORKERS", str(os.cpu_count() or 1)))
+
+# Model artifact to serve: "forest" (memory-mapped flat arrays), "pickle",
+# or "auto" (forest export when present, otherwise the pickle). The
+# compressed forest chosen by the compression stage is preferred.
+MODEL_FORMAT = os.getenv("MODEL_FORMAT", "auto")
+MODEL_FILES = {
+    "forest": ["models/rf_served", "models/rf_forest", "rf_served", "rf_forest"],
+    "pickle": ["models/rf_model.pkl", "rf_model.pkl"],
+}
+
+# Training medians written by the preprocessing stage; used to fill features
+# that are missing (null or omitted) in prediction requests
+IMPUTER_FILES = ["models/imputer.json", "imputer.json"]
+
+# Inference engine: "vectorized" evaluates all trees at once with NumPy
+# (a pickled forest is flattened at load time); "sklearn" serves the
+# pickled RandomForestClassifier as is
+INFERENCE_ENGINE = os.getenv("INFERENCE_ENGINE", "vectorized")
+INFERENCE_ENGINES = ("vectorized", "sklearn")
+# The vectorized engine walks every tree level for every sample, which only
+# pays off for small batches; larger ones go to an sklearn forest rebuilt
+# from the same nodes. Empty = always use the vectorized walk
+VECTORIZED_MAX_ROWS = os.getenv("VECTORIZED_MAX_ROWS", str(DEFAULT_VECTORIZED_MAX_ROWS))
+VECTORIZED_MAX_ROWS = int(VECTORIZED_MAX_ROWS) if VECTORIZED_MAX_ROWS else None
+
+# Decision threshold on the probability of potable water: samples scoring
+# above it are reported as consumable. Set to override the threshold in the
+# model metadata (meta.json "decision_threshold"); 0.5 if neither is set
+DECISION_THRESHOLD = os.getenv("DECISION_THRESHOLD")
+
+# Prediction cache for /predict: entry/byte bounds, TTL and optional
+# per-feature quantization steps, e.g. "ph=0.01,Solids=1"
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "100000"))
+CACHE_MAX_BYTES = int(os.getenv("CACHE_MAX_BYTES", "0")) or None
+CACHE_TTL_SECONDS = float(os.getenv("CACHE_TTL_SECONDS", "0")) or None
+CACHE_QUANTIZATION = parse_quantization(os.getenv("CACHE_QUANTIZATION", ""))
+
+# Hot reload: poll the model artifact every N seconds (0 disables), how long
+# an old model may keep serving in-flight requests, and an optional token
+# required by POST /admin/reload (X-Admin-Token header)
+MODEL_WATCH_INTERVAL = float(os.getenv("MODEL_WATCH_INTERVAL", "0"))
+MODEL_DRAIN_TIMEOUT = float(os.getenv("MODEL_DRAIN_TIMEOUT", "30"))
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
+
+# Typical readings used to warm a freshly loaded model before it goes live
+WARMUP_SAMPLES = [
+    [7.0, 200.0, 20000.0, 7.0, 300.0, 400.0, 15.0, 60.0, 4.0],
+    [5.5, 150.0, 30000.0, 9.0, 250.0, 500.0, 10.0, 80.0, 5.0],
+    [8.5, 250.0, 10000.0, 5.0, 350.0, 300.0, 20.0, 40.0, 3.0],
+]
+
 # ==============================================================
 # Enable CORS
 # ==============================================================
@@ -36,58 +145,259 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# ==============================================================
+# Metrics
+# ==============================================================
+metrics = MetricsRegistry()
+REQUESTS = metrics.counter(
+    "api_requests_total", "HTTP requests by route, method and status.", ("route", "method", "status")
+)
+REQUEST_LATENCY = metrics.histogram(
+    "api_request_duration_seconds", "End-to-end request latency by route.", ("route",)
+)
+PHASE_LATENCY = metrics.histogram(
+    "api_request_phase_seconds",
+    "Prediction request latency split into parse, build, inference and serialize phases.",
+    ("route", "phase"),
+)
+MICRO_BATCH_SIZE = metrics.histogram(
+    "api_inference_batch_size", "Rows per model call (after micro-batching).", buckets=SIZE_BUCKETS
+)
+BATCH_REQUEST_SIZE = metrics.histogram(
+    "api_batch_request_size", "Samples per request on the batch routes.", ("route",), buckets=SIZE_BUCKETS
+)
+STREAMED_ROWS = metrics.counter("api_streamed_rows_total", "Rows scored on the streaming route.", ("format",))
+
+app.add_middleware(MetricsMiddleware, requests=REQUESTS, latency=REQUEST_LATENCY, phases=PHASE_LATENCY)
+
+
+def phase_timer(request: Request, route: str) -> PhaseTimer:
+    """Phase timer started by the metrics middleware for this request."""
+    timer = getattr(request.state, "timer", None) or PhaseTimer(PHASE_LATENCY)
+    timer.route = route
+    return timer
+
 # ==============================================================
 # Pydantic Models
 # ==============================================================
 class Water(BaseModel):
-    ph: float
-    Hardness: float
-    Solids: float
-    Chloramines: float
-    Sulfate: float
-    Conductivity: float
-    Organic_carbon: float
-    Trihalomethanes: float
-    Turbidity: float
+    """One sample; omitted or null features are imputed with training medians."""
+    ph: Optional[float] = None
+    Hardness: Optional[float] = None
+    Solids: Optional[float] = None
+    Chloramines: Optional[float] = None
+    Sulfate: Optional[float] = None
+    Conductivity: Optional[float] = None
+    Organic_carbon: Optional[float] = None
+    Trihalomethanes: Optional[float] = None
+    Turbidity: Optional[float] = None
+
+
+class WaterArray(BaseModel):
+    """Compact single-sample payload: feature values in FEATURES order."""
+    values: List[Optional[float]]
+
+    @model_validator(mode="after")
+    def check_length(self):
+        if len(self.values) != len(FEATURES):
+            raise ValueError(f"Expected {len(FEATURES)} values in the order {FEATURES}.")
+        return self
+
+
+class WaterArrayBatch(BaseModel):
+    """Compact batch payload: one list of values per sample, in FEATURES order."""
+    rows: List[List[Optional[float]]]
+
+    @model_validator(mode="after")
+    def check_lengths(self):
+        if any(len(row) != len(FEATURES) for row in self.rows):
+            raise ValueError(f"Every row must have {len(FEATURES)} values in the order {FEATURES}.")
+        return self
 
 
 class PredictionResponse(BaseModel):
     prediction: int
+    probability: float
     result: str
 
 
+class WaterColumns(BaseModel):
+    """Columnar batch payload: one array per feature, all the same length."""
+    ph: List[Optional[float]]
+    Hardness: List[Optional[float]]
+    Solids: List[Optional[float]]
+    Chloramines: List[Optional[float]]
+    Sulfate: List[Optional[float]]
+    Conductivity: List[Optional[float]]
+    Organic_carbon: List[Optional[float]]
+    Trihalomethanes: List[Optional[float]]
+    Turbidity: List[Optional[float]]
+
+    @model_validator(mode="after")
+    def check_lengths(self):
+        lengths = {len(getattr(self, feature)) for feature in FEATURES}
+        if len(lengths) > 1:
+            raise ValueError("All feature arrays must have the same length.")
+        return self
+
+
+class BatchPredictionResponse(BaseModel):
+    count: int
+    predictions: List[int]
+    probabilities: List[float]
+    results: List[str]
+
+
 # ==============================================================
 # Model Loading
 # ==============================================================
-model = None
-model_info = {}
+cache = PredictionCache(
+    FEATURES,
+    max_entries=CACHE_MAX_ENTRIES,
+    max_bytes=CACHE_MAX_BYTES,
+    ttl_seconds=CACHE_TTL_SECONDS,
+    quantization=CACHE_QUANTIZATION,
+)
 
 
-def load_model() -> bool:
-    """Load the trained model from a pickle file."""
-    global model, model_info
+def locate_model() -> Path:
+    """Path of the model artifact to serve, according to the configuration."""
+    if INFERENCE_ENGINE not in INFERENCE_ENGINES:
+        raise ValueError(f"Unknown INFERENCE_ENGINE '{INFERENCE_ENGINE}'.")
+
+    if INFERENCE_ENGINE == "sklearn":
+        # Only the pickle holds the sklearn estimator itself
+        candidates = MODEL_FILES["pickle"]
+    elif MODEL_FORMAT == "auto":
+        candidates = MODEL_FILES["forest"] + MODEL_FILES["pickle"]
+    elif MODEL_FORMAT in MODEL_FILES:
+        candidates = MODEL_FILES[MODEL_FORMAT]
+    else:
+        raise ValueError(f"Unknown MODEL_FORMAT '{MODEL_FORMAT}'.")
+
+    # Entries without "models/" are the fallback when running locally without docker volume mapping
+    model_path = next((Path(path) for path in candidates if Path(path).exists()), None)
+    if model_path is None:
+        raise FileNotFoundError(f"Model file '{candidates[0]}' not found.")
+    return model_path
+
+
+def read_imputer() -> Optional[MedianImputer]:
+    """Training medians saved by the preprocessing stage, if present."""
+    path = next((path for path in IMPUTER_FILES if Path(path).exists()), None)
+    if path is None:
+        logger.warning("No imputer found; requests with missing features will be rejected.")
+        return None
+    return MedianImputer.load(path)
+
 
+def resolve_threshold(model) -> tuple[float, str]:
+    """Decision threshold to serve ``model`` with, and where it came from."""
+    if DECISION_THRESHOLD:
+        threshold, source = float(DECISION_THRESHOLD), "config"
+    elif decision_threshold(model) is not None:
+        threshold, source = float(decision_threshold(model)), "model"
+    else:
+        return DEFAULT_DECISION_THRESHOLD, "default"
+
+    if not 0.0 <= threshold <= 1.0:
+        raise ValueError(f"Decision threshold {threshold} ({source}) must be between 0 and 1.")
+    return threshold, source
+
+
+def read_model() -> ModelVersion:
+    """Load the configured artifact (memory-mapped forest export or pickle)."""
+    model_path = locate_model()
+    version = artifact_fingerprint(model_path)
+    # meta.json only holds metadata (such as the threshold); the arrays
+    # identify the forest itself
+    weights_version = artifact_fingerprint(model_path, exclude=("meta.json",))
+    model = load_artifact(
+        str(model_path),
+        vectorized=INFERENCE_ENGINE == "vectorized",
+        vectorized_max_rows=VECTORIZED_MAX_ROWS,
+    )
+    imputer = read_imputer()
+    threshold, threshold_source = resolve_threshold(model)
+
+    info = {
+        "model_path": str(model_path),
+        "model_format": "forest" if model_path.is_dir() else "pickle",
+        "inference_engine": INFERENCE_ENGINE,
+        "vectorized_max_rows": VECTORIZED_MAX_ROWS,
+        "model_type": "Random Forest Classifier",
+        "target": "Water Potability",
+        "imputer": imputer.to_dict() if imputer is not None else None,
+        "decision_threshold": threshold,
+        "decision_threshold_source": threshold_source,
+    }
+    return ModelVersion(
+        model, info, version, imputer=imputer, threshold=threshold, weights_version=weights_version
+    )
+
+
+def predict_matrix(model, order: Optional[np.ndarray], rows: np.ndarray) -> np.ndarray:
+    """predict_proba for a (n_samples, n_features) matrix in FEATURES order.
+
+    ``order`` (from ``column_order``) permutes the columns into the order the
+    model was fitted with; a flat forest takes the bare array.
+    """
+    return model.predict_proba(model_input(model, rows, order))
+
+
+def make_executor(version: ModelVersion) -> InferenceExecutor:
+    """Inference executor bound to one model version."""
+    return InferenceExecutor(
+        functools.partial(predict_matrix, version.model, column_order(version.model, FEATURES)),
+        mode=INFERENCE_EXECUTOR,
+        workers=INFERENCE_WORKERS,
+        model_path=version.info["model_path"],
+        features=FEATURES,
+        vectorized=INFERENCE_ENGINE == "vectorized",
+        vectorized_max_rows=VECTORIZED_MAX_ROWS,
+    )
+
+
+def on_model_swap(version: ModelVersion, old: Optional[ModelVersion]) -> None:
+    if old is not None and old.weights_version == version.weights_version:
+        # Same forest: the cached probabilities still hold and the new
+        # threshold is applied to them on the way out
+        logger.info(f"Decision threshold {old.threshold} -> {version.threshold}; prediction cache kept")
+        return
+    # Cached results belong to the previous model
+    cache.clear()
+
+
+registry = ModelRegistry(
+    read_model,
+    make_executor,
+    warmup=pd.DataFrame(WARMUP_SAMPLES, columns=FEATURES),
+    on_swap=on_model_swap,
+    drain_timeout=MODEL_DRAIN_TIMEOUT,
+)
+
+
+metrics.gauge(
+    "model_load_seconds",
+    "Time taken to load the active model artifact.",
+    lambda: registry.current.load_seconds if registry.current else None,
+)
+metrics.gauge("model_reloads_total", "Successful hot reloads.", lambda: registry.reloads, kind="counter")
+metrics.gauge("process_resident_memory_bytes", "Resident memory of this worker process.", process_rss_bytes)
+metrics.gauge("prediction_cache_hits_total", "Prediction cache hits.", lambda: cache.hits, kind="counter")
+metrics.gauge("prediction_cache_misses_total", "Prediction cache misses.", lambda: cache.misses, kind="counter")
+metrics.gauge(
+    "prediction_cache_evictions_total", "Prediction cache evictions.", lambda: cache.evictions, kind="counter"
+)
+metrics.gauge("prediction_cache_entries", "Entries in the prediction cache.", lambda: len(cache))
+
+
+def load_model() -> bool:
+    """Load, warm and activate the model synchronously (start-up path)."""
     try:
-        model_path = Path("models/rf_model.pkl")  # Updated path
-
-        if not model_path.exists():
-            # Fallback to local if running locally without docker volume mapping
-            model_path_local = Path("rf_model.pkl")
-            if model_path_local.exists():
-                 model_path = model_path_local
-            else:
-                 raise FileNotFoundError(f"Model file '{model_path}' not found.")
-
-        with open(model_path, "rb") as file:
-            model = pickle.load(file)
-
-        model_info = {
-            "model_path": str(model_path),
-            "model_type": "Random Forest Classifier",
-            "target": "Water Potability",
-        }
-
-        logger.info(f"✅ Model loaded successfully from {model_path}")
+        version = registry.load()
+        registry.activate(version)
+        logger.info(f"✅ Model loaded successfully from {version.info['model_path']}")
         return True
 
     except Exception as e:
@@ -96,16 +406,231 @@ def load_model() -> bool:
 
 
 # ==============================================================
-# Startup Event
+# Batch Inference
+# ==============================================================
+def result_text(prediction: int) -> str:
+    """Human readable label for a predicted class."""
+    return "Water is Consumable" if prediction == 1 else "Water is Not Consumable"
+
+
+def decode_proba(proba: np.ndarray, version: ModelVersion) -> tuple[np.ndarray, np.ndarray]:
+    """Predicted classes and probability of the "potable" class per row.
+
+    A row is predicted potable when that probability is above the version's
+    decision threshold.
+    """
+    return threshold_predictions(proba, version.model.classes_, version.threshold)
+
+
+def impute_rows(rows: np.ndarray, version: ModelVersion) -> np.ndarray:
+    """Fill missing (NaN) feature values with the training medians.
+
+    Done in place unless ``rows`` is a read-only view (a decoded binary
+    body), which is copied first; use the returned matrix.
+    """
+    if np.isnan(rows).any():
+        if version.imputer is None:
+            raise HTTPException(
+                status_code=422, detail="Missing feature values and no fitted imputer is available."
+            )
+        if not rows.flags.writeable:
+            rows = rows.copy()
+        version.imputer.transform_array(rows, FEATURES)
+    return rows
+
+
+# Feature values of a validated Water payload as a tuple in FEATURES order
+water_values = operator.attrgetter(*FEATURES)
+
+
+def sample_rows(samples: List[Water]) -> np.ndarray:
+    """Preallocated float64 matrix of ``samples`` in FEATURES order (None -> NaN)."""
+    rows = np.empty((len(samples), len(FEATURES)), dtype=np.float64)
+    for i, sample in enumerate(samples):
+        rows[i] = water_values(sample)
+    return rows
+
+
+def column_rows(columns: WaterColumns) -> np.ndarray:
+    """Preallocated float64 matrix of a columnar payload in FEATURES order."""
+    rows = np.empty((len(columns.ph), len(FEATURES)), dtype=np.float64)
+    for j, feature in enumerate(FEATURES):
+        rows[:, j] = getattr(columns, feature)
+    return rows
+
+
+def check_batch_size(count: int) -> None:
+    """Reject batches larger than the configured maximum."""
+    if count > MAX_BATCH_SIZE:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Batch of {count} samples exceeds the maximum of {MAX_BATCH_SIZE}.",
+        )
+
+
+async def score_rows(rows: np.ndarray, timer: Optional[PhaseTimer] = None) -> tuple[np.ndarray, np.ndarray]:
+    """Run one vectorized predict_proba over every row of a FEATURES-ordered matrix.
+
+    Returns the predicted classes and the probability of the "potable" class.
+    """
+    if len(rows) == 0:
+        return np.empty(0, dtype=int), np.empty(0, dtype=np.float64)
+
+    # One version for the medians, the model and the threshold
+    with registry.acquire() as version:
+        rows = impute_rows(rows, version)
+        if timer is not None:
+            timer.mark("build")
+        MICRO_BATCH_SIZE.observe(len(rows))
+        proba = await version.executor.run(rows)
+    if timer is not None:
+        timer.mark("inference")
+
+    return decode_proba(proba, version)
+
+
+def batch_response(request: Request, predictions: np.ndarray, probabilities: np.ndarray):
+    """Batch results in the format the client asked for (Accept header)."""
+    fmt = response_format(request.headers.get("accept", ""))
+    if fmt != "json":
+        return Response(encode_predictions(fmt, predictions, probabilities), media_type=CONTENT_TYPES[fmt])
+    return BatchPredictionResponse(
+        count=len(predictions),
+        predictions=predictions.tolist(),
+        probabilities=probabilities.tolist(),
+        results=[result_text(p) for p in predictions],
+    )
+
+
+async def run_inference(rows: np.ndarray) -> list:
+    """Dispatch a prediction matrix to the active model's executor.
+
+    Returns one ``(probabilities, version)`` pair per row, so each caller
+    knows which model version scored its row.
+    """
+    with registry.acquire() as version:
+        MICRO_BATCH_SIZE.observe(len(rows))
+        proba = await version.executor.run(rows)
+    return [(row, version) for row in proba]
+
+
+batcher = MicroBatcher(
+    run_inference,
+    max_batch_size=BATCH_MAX_SIZE,
+    max_wait_ms=BATCH_MAX_WAIT_MS,
+    max_concurrent_batches=INFERENCE_WORKERS,
+)
+
+
+async def predict_row(row: np.ndarray, timer: PhaseTimer) -> PredictionResponse:
+    """Score one (1, n_features) row through the cache and the micro-batcher.
+
+    The row is imputed, scored and thresholded by a single model version.
+    """
+    with registry.acquire() as version:
+        # Read before any await: the cache holds this version's results until
+        # a swap clears it and bumps the generation
+        generation = cache.generation
+        row = impute_rows(row, version)
+        key = cache.key(row[0].tolist())
+        timer.mark("build")
+
+        # The cache holds probabilities, so the threshold applies to hits too
+        proba = cache.get(key)
+        if proba is None:
+            # Coalesced with concurrent requests into one predict_proba call
+            proba, scored_by = await batcher.submit(row)
+            if scored_by.weights_version != version.weights_version:
+                # A reload swapped models while the row was queued
+                MICRO_BATCH_SIZE.observe(1)
+                proba = (await version.executor.run(row))[0]
+            cache.put(key, proba, generation=generation)
+        timer.mark("inference")
+
+    predictions, probabilities = decode_proba(proba.reshape(1, -1), version)
+    prediction = int(predictions[0])
+    return PredictionResponse(
+        prediction=prediction, probability=float(probabilities[0]), result=result_text(prediction)
+    )
+
+
+# ==============================================================
+# Binary Wire Formats
+# ==============================================================
+async def predict_binary(request: Request, fmt: str, route: str) -> Response:
+    """Score a MessagePack / float32 matrix / Arrow batch body."""
+    timer = phase_timer(request, route)
+    if registry.current is None:
+        raise HTTPException(status_code=503, detail="Model not loaded")
+    try:
+        rows = decode_rows(await request.body(), fmt, FEATURES)
+    except WireFormatError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid {CONTENT_TYPES[fmt]} body: {e}")
+    timer.mark("parse")
+    check_batch_size(len(rows))
+    BATCH_REQUEST_SIZE.observe(len(rows), route)
+
+    try:
+        result = batch_response(request, *await score_rows(rows, timer))
+        # Bypasses the route's response_model, so serialize JSON here
+        return result if isinstance(result, Response) else JSONResponse(result.model_dump())
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Batch prediction error: {e}")
+        raise HTTPException(status_code=500, detail=f"Prediction failed: {str(e)}")
+
+
+class NegotiatedRoute(APIRoute):
+    """Batch route that also accepts the binary wire formats.
+
+    A MessagePack, float32 matrix or Arrow body is decoded straight into a
+    FEATURES-ordered matrix, skipping per-sample validation; any other body
+    goes through the route's JSON model as usual. Responses follow the
+    Accept header either way (``batch_response``).
+    """
+
+    def get_route_handler(self):
+        json_handler = super().get_route_handler()
+        route = self.path_format
+
+        async def route_handler(request: Request) -> Response:
+            fmt = request_format(request.headers.get("content-type", ""))
+            if fmt == "json":
+                return await json_handler(request)
+            return await predict_binary(request, fmt, route)
+
+        return route_handler
+
+
+batch_routes = APIRouter(route_class=NegotiatedRoute)
+
+
+# ==============================================================
+# Startup / Shutdown Events
 # ==============================================================
 @app.on_event("startup")
 async def startup_event():
-    """Load model when the server starts."""
-    success = load_model()
+    """Load model and start the inference workers when the server starts."""
+    # serve.py loads the model in the master process before forking workers
+    success = registry.current is not None or load_model()
     if not success:
         logger.error("Failed to load model on startup.")
     else:
         logger.info("Model loaded and ready for predictions.")
+        registry.start_executor(registry.current)
+        batcher.start()
+
+    if MODEL_WATCH_INTERVAL > 0:
+        registry.watch(locate_model, MODEL_WATCH_INTERVAL)
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Serve any queued requests before the server exits."""
+    await batcher.stop()
+    await registry.shutdown()
 
 
 # ==============================================================
@@ -114,54 +639,226 @@ async def startup_event():
 @app.get("/")
 async def root():
     """Root endpoint with model info."""
+    current = registry.current
     return {
         "message": "🚰 Water Potability Prediction API is running.",
-        "model_info": model_info,
-        "model_loaded": model is not None,
+        "model_info": current.describe() if current else {},
+        "model_version": current.version if current else None,
+        "model_loaded": current is not None,
+        "registry": registry.stats(),
+        "batching": batcher.stats(),
+        "executor": current.executor.info() if current and current.executor else None,
+        "cache": cache.stats(),
     }
 
 
 @app.get("/health")
 async def health_check():
     """Health check endpoint."""
-    if model is None:
+    if registry.current is None:
         raise HTTPException(status_code=503, detail="Model not loaded")
     return {"status": "healthy", "model_loaded": True}
 
 
+@app.get("/metrics", response_class=PlainTextResponse)
+async def prometheus_metrics():
+    """Prometheus text-format metrics for this worker process."""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+
 @app.post("/predict", response_model=PredictionResponse)
-async def predict_potability(water: Water):
+async def predict_potability(water: Water, request: Request):
     """Predict whether water is potable or not."""
-    if model is None:
+    timer = phase_timer(request, "/predict")
+    timer.mark("parse")
+    if registry.current is None:
+        raise HTTPException(status_code=503, detail="Model not loaded")
+
+    try:
+        # Input row in training feature order (None -> NaN -> median)
+        row = np.empty((1, len(FEATURES)), dtype=np.float64)
+        row[0] = water_values(water)
+        return await predict_row(row, timer)
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Prediction error: {e}")
+        raise HTTPException(status_code=500, detail=f"Prediction failed: {str(e)}")
+
+
+@app.post("/predict/array", response_model=PredictionResponse)
+async def predict_array(sample: WaterArray, request: Request):
+    """Predict potability for one sample sent as a bare array of feature values."""
+    timer = phase_timer(request, "/predict/array")
+    timer.mark("parse")
+    if registry.current is None:
         raise HTTPException(status_code=503, detail="Model not loaded")
 
     try:
-        # Prepare input data
-        sample = pd.DataFrame([{
-            "ph": water.ph,
-            "Hardness": water.Hardness,
-            "Solids": water.Solids,
-            "Chloramines": water.Chloramines,
-            "Sulfate": water.Sulfate,
-            "Conductivity": water.Conductivity,
-            "Organic_carbon": water.Organic_carbon,
-            "Trihalomethanes": water.Trihalomethanes,
-            "Turbidity": water.Turbidity,
-        }])
-
-        # Make prediction
-        prediction = model.predict(sample)[0]
-        result = "Water is Consumable" if prediction == 1 else "Water is Not Consumable"
-
-        return PredictionResponse(prediction=int(prediction), result=result)
+        row = np.empty((1, len(FEATURES)), dtype=np.float64)
+        row[0] = sample.values
+        return await predict_row(row, timer)
 
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Prediction error: {e}")
         raise HTTPException(status_code=500, detail=f"Prediction failed: {str(e)}")
 
 
+@batch_routes.post("/predict/batch", response_model=BatchPredictionResponse)
+async def predict_batch(samples: List[Water], request: Request):
+    """Predict potability for a list of samples in a single model call."""
+    timer = phase_timer(request, "/predict/batch")
+    timer.mark("parse")
+    if registry.current is None:
+        raise HTTPException(status_code=503, detail="Model not loaded")
+    check_batch_size(len(samples))
+    BATCH_REQUEST_SIZE.observe(len(samples), "/predict/batch")
+
+    try:
+        return batch_response(request, *await score_rows(sample_rows(samples), timer))
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Batch prediction error: {e}")
+        raise HTTPException(status_code=500, detail=f"Prediction failed: {str(e)}")
+
+
+@batch_routes.post("/predict/batch/columns", response_model=BatchPredictionResponse)
+async def predict_batch_columns(columns: WaterColumns, request: Request):
+    """Predict potability for a columnar batch (one array per feature)."""
+    timer = phase_timer(request, "/predict/batch/columns")
+    timer.mark("parse")
+    if registry.current is None:
+        raise HTTPException(status_code=503, detail="Model not loaded")
+    check_batch_size(len(columns.ph))
+    BATCH_REQUEST_SIZE.observe(len(columns.ph), "/predict/batch/columns")
+
+    try:
+        return batch_response(request, *await score_rows(column_rows(columns), timer))
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Batch prediction error: {e}")
+        raise HTTPException(status_code=500, detail=f"Prediction failed: {str(e)}")
+
+
+@batch_routes.post("/predict/batch/array", response_model=BatchPredictionResponse)
+async def predict_batch_array(batch: WaterArrayBatch, request: Request):
+    """Predict potability for a batch sent as rows of feature values in FEATURES order."""
+    timer = phase_timer(request, "/predict/batch/array")
+    timer.mark("parse")
+    if registry.current is None:
+        raise HTTPException(status_code=503, detail="Model not loaded")
+    check_batch_size(len(batch.rows))
+    BATCH_REQUEST_SIZE.observe(len(batch.rows), "/predict/batch/array")
+
+    try:
+        rows = np.array(batch.rows, dtype=np.float64).reshape(len(batch.rows), len(FEATURES))
+        return batch_response(request, *await score_rows(rows, timer))
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Batch prediction error: {e}")
+        raise HTTPException(status_code=500, detail=f"Prediction failed: {str(e)}")
+
+
+app.include_router(batch_routes)
+
+
+@app.post("/admin/reload")
+async def reload_model(x_admin_token: Optional[str] = Header(default=None)):
+    """Load the latest model artifact and swap it in without downtime."""
+    if ADMIN_TOKEN and x_admin_token != ADMIN_TOKEN:
+        raise HTTPException(status_code=401, detail="Invalid admin token")
+
+    previous = registry.current.version if registry.current else None
+    try:
+        version = await registry.reload()
+    except ReloadInProgress as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except Exception as e:
+        logger.error(f"❌ Model reload failed: {e}")
+        raise HTTPException(status_code=500, detail=f"Reload failed, previous model kept: {str(e)}")
+
+    if not batcher.running:
+        batcher.start()
+    return {"previous_version": previous, "model_info": version.describe()}
+
+
+def stream_error(fmt: str, message: str, fields: dict) -> bytes:
+    """In-band error record for the streaming route (NDJSON object or CSV comment)."""
+    if fmt == "ndjson":
+        return (json.dumps({"error": message, **fields}) + "\n").encode("utf-8")
+    return f"# error: {message}\n".encode("utf-8")
+
+
+async def score_stream_chunk(rows: np.ndarray, fmt: str, first_row: int) -> bytes:
+    """Results of one streamed chunk, or an error record if it cannot be scored."""
+    try:
+        # Decode with the version that scored the chunk, even if a reload
+        # swaps models in between
+        with registry.acquire() as version:
+            rows = impute_rows(rows, version)
+            MICRO_BATCH_SIZE.observe(len(rows))
+            proba = await version.executor.run(rows)
+        predictions, probabilities = decode_proba(proba, version)
+    except Exception as e:
+        # The response has already started; report the failed chunk in-band
+        # and carry on with the next one
+        message = e.detail if isinstance(e, HTTPException) else str(e)
+        logger.error(f"Streaming prediction error: {message}")
+        return stream_error(fmt, f"rows {first_row}-{first_row + len(rows) - 1}: {message}",
+                            {"first_row": first_row, "rows": len(rows)})
+
+    STREAMED_ROWS.inc(fmt, amount=len(rows))
+    return format_results(fmt, predictions, probabilities, [result_text(p) for p in predictions])
+
+
+@app.post("/predict/stream")
+async def predict_stream(request: Request):
+    """Score a streamed NDJSON or CSV upload chunk by chunk.
+
+    The body is parsed incrementally, ``STREAM_CHUNK_ROWS`` rows at a time;
+    each chunk is scored with one model call and its results are streamed
+    back (same format as the upload, in input order) before the next chunk
+    is read, so memory stays bounded whatever the upload size. Clients
+    should read the response while they are still sending. A chunk that
+    cannot be scored is reported in-band as an error record and skipped.
+    """
+    if registry.current is None:
+        raise HTTPException(status_code=503, detail="Model not loaded")
+    try:
+        fmt = stream_format(request.headers.get("content-type", ""))
+    except KeyError:
+        raise HTTPException(
+            status_code=415, detail="Send application/x-ndjson or text/csv to /predict/stream."
+        )
+
+    async def results():
+        if fmt == "csv":
+            yield b"prediction,probability,result\n"
+        first_row = 0
+        try:
+            async for rows in iter_row_chunks(request.stream(), fmt, FEATURES, STREAM_CHUNK_ROWS):
+                yield await score_stream_chunk(rows, fmt, first_row)
+                first_row += len(rows)
+        except StreamFormatError as e:
+            # The response has already started; report the error in-band and stop
+            logger.error(f"Streaming prediction error: {e}")
+            yield stream_error(fmt, str(e), {"line": e.line_number})
+
+    media_type = "application/x-ndjson" if fmt == "ndjson" else "text/csv"
+    return DuplexStreamingResponse(results(), media_type=media_type)
+
+
 # ==============================================================
-# Run the Application
+# Run the Application (development; use serve.py in production)
 # ==============================================================
 if __name__ == "__main__":
     import uvicorn
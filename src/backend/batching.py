@@ -0,0 +1,162 @@
+import asyncio
+import logging
+from collections import Counter
+from typing import Awaitable, Callable, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class MicroBatcher:
+    """Coalesce concurrent single-sample requests into one model call.
+
+    Requests are queued with ``submit``. A background task drains the queue
+    into a batch until either ``max_batch_size`` samples are collected or
+    ``max_wait_ms`` has passed since the first sample arrived, stacks them
+    into one matrix, awaits ``predict_fn`` once and resolves every waiting
+    request with its own row of the result. Up to ``max_concurrent_batches``
+    batches may be in flight at once so a worker pool stays busy.
+    """
+
+    def __init__(
+        self,
+        predict_fn: Callable[[np.ndarray], Awaitable[np.ndarray]],
+        max_batch_size: int = 32,
+        max_wait_ms: float = 5.0,
+        max_concurrent_batches: int = 1,
+    ):
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be at least 1.")
+        self.predict_fn = predict_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.max_concurrent_batches = max(1, max_concurrent_batches)
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._in_flight: set = set()
+
+        # Batch size -> number of batches of that size
+        self.batch_sizes = Counter()
+        self.total_batches = 0
+        self.total_requests = 0
+
+    # ----------------------------------------------------------
+    # Lifecycle
+    # ----------------------------------------------------------
+    def start(self) -> None:
+        """Start the background batching loop on the running event loop."""
+        if self._task is None:
+            self._queue = asyncio.Queue()
+            self._slots = asyncio.Semaphore(self.max_concurrent_batches)
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Flush queued requests and stop the background loop."""
+        if self._task is None:
+            return
+        # Sentinel: everything queued before it is still served
+        await self._queue.put(None)
+        await self._task
+        if self._in_flight:
+            await asyncio.gather(*self._in_flight)
+        self._task = None
+        self._queue = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None
+
+    # ----------------------------------------------------------
+    # Requests
+    # ----------------------------------------------------------
+    async def submit(self, row: np.ndarray) -> np.ndarray:
+        """Queue one feature row and wait for its prediction row."""
+        if self._task is None:
+            raise RuntimeError("MicroBatcher is not running.")
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((row, future))
+        return await future
+
+    async def _collect(self) -> tuple[list, bool]:
+        """Wait for the first request, then gather more until full or timed out."""
+        first = await self._queue.get()
+        if first is None:
+            return [], True
+
+        batch = [first]
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.max_wait
+
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                item = await asyncio.wait_for(self._queue.get(), timeout=remaining)
+            except asyncio.TimeoutError:
+                break
+            if item is None:
+                return batch, True
+            batch.append(item)
+
+        return batch, False
+
+    async def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            # Don't start collecting a new batch until a slot is free, so
+            # requests keep accumulating while all workers are busy
+            await self._slots.acquire()
+            batch, stopping = await self._collect()
+            if not batch:
+                self._slots.release()
+                continue
+            task = asyncio.create_task(self._process(batch))
+            self._in_flight.add(task)
+            task.add_done_callback(self._in_flight.discard)
+
+    async def _process(self, batch: list) -> None:
+        try:
+            await self._predict(batch)
+        finally:
+            self._slots.release()
+
+    async def _predict(self, batch: list) -> None:
+        rows = np.vstack([row for row, _ in batch])
+
+        self.batch_sizes[len(batch)] += 1
+        self.total_batches += 1
+        self.total_requests += len(batch)
+
+        try:
+            results = await self.predict_fn(rows)
+        except Exception as e:
+            logger.error(f"Batched prediction failed: {e}")
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for (_, future), result in zip(batch, results):
+            # The caller may have gone away (client disconnect / cancellation)
+            if not future.done():
+                future.set_result(result)
+
+    # ----------------------------------------------------------
+    # Metrics
+    # ----------------------------------------------------------
+    def stats(self) -> dict:
+        """Achieved batch sizes and configuration."""
+        mean = self.total_requests / self.total_batches if self.total_batches else 0.0
+        return {
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000.0,
+            "max_concurrent_batches": self.max_concurrent_batches,
+            "total_requests": self.total_requests,
+            "total_batches": self.total_batches,
+            "mean_batch_size": round(mean, 3),
+            "batch_size_counts": {str(size): count for size, count in sorted(self.batch_sizes.items())},
+        }
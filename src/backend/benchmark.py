@@ -0,0 +1,416 @@
+"""Load-test and latency benchmark for the serving stack.
+
+Usage (from the project root):
+    python src/backend/benchmark.py [--concurrency 1,8,32] [--batch-sizes 10,100,1000]
+                                    [--requests 500] [--routes predict,batch_array]
+                                    [--url http://host:8000] [--baseline old.json]
+                                    [--output reports/benchmark.json]
+
+Starts the FastAPI app with uvicorn on a free local port (unless ``--url``
+points at a running server), then drives every selected route at every
+concurrency level -- and batch routes at every batch size -- with
+keep-alive connections, recording throughput and p50/p95/p99 latency.
+
+It also microbenchmarks, in process, the load time of each model artifact
+and the cost of ``predict_proba`` from a single row up to large batches
+(``--predict-batch-sizes``) for the vectorized, size-dispatched and sklearn
+engines.
+
+Results are written as JSON together with the git commit, so runs can be
+compared between commits; ``--baseline`` prints the change against an
+earlier result file. Extra ``KEY=VALUE`` pairs given with ``--env`` are
+passed to the server (e.g. ``--env INFERENCE_EXECUTOR=process``).
+"""
+import argparse
+import http.client
+import itertools
+import json
+import os
+import platform
+import socket
+import struct
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+
+import numpy as np
+
+# Make the project root importable for the shared src.* modules
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+sys.path.insert(0, ROOT)
+from src.models.forest_format import DEFAULT_VECTORIZED_MAX_ROWS, column_order, load_artifact, model_input
+
+FEATURES = [
+    "ph",
+    "Hardness",
+    "Solids",
+    "Chloramines",
+    "Sulfate",
+    "Conductivity",
+    "Organic_carbon",
+    "Trihalomethanes",
+    "Turbidity",
+]
+
+# Mean / standard deviation of each feature in the water potability data,
+# used to synthesize requests when no --data file is given
+FEATURE_STATS = {
+    "ph": (7.08, 1.59),
+    "Hardness": (196.4, 32.9),
+    "Solids": (22014.0, 8768.0),
+    "Chloramines": (7.12, 1.58),
+    "Sulfate": (333.8, 41.4),
+    "Conductivity": (426.2, 80.8),
+    "Organic_carbon": (14.28, 3.31),
+    "Trihalomethanes": (66.4, 16.2),
+    "Turbidity": (3.97, 0.78),
+}
+
+MODEL_ARTIFACTS = ["models/rf_served", "models/rf_forest", "models/rf_model.pkl"]
+
+
+# ==============================================================
+# Payloads
+# ==============================================================
+def sample_rows(n: int, data_path: str = None, seed: int = 42) -> np.ndarray:
+    """(n, n_features) request rows, from ``data_path`` or synthesized."""
+    rng = np.random.default_rng(seed)
+    if data_path:
+        from src.data.storage import read_table
+
+        rows = read_table(data_path, columns=FEATURES).dropna().to_numpy(dtype=np.float64)
+        return rows[rng.integers(0, len(rows), n)]
+    means, stds = np.array(list(FEATURE_STATS.values())).T
+    return np.abs(rng.normal(means, stds, size=(n, len(FEATURES))))
+
+
+def tensor_body(rows: np.ndarray) -> bytes:
+    matrix = np.ascontiguousarray(rows, dtype="<f4")
+    return struct.pack("<4sII", b"F32M", *matrix.shape) + matrix.tobytes()
+
+
+# name: (path, content type, batched, body builder)
+ROUTES = {
+    "predict": ("/predict", "application/json", False,
+                lambda rows: json.dumps(dict(zip(FEATURES, rows[0].tolist())))),
+    "predict_array": ("/predict/array", "application/json", False,
+                      lambda rows: json.dumps({"values": rows[0].tolist()})),
+    "batch": ("/predict/batch", "application/json", True,
+              lambda rows: json.dumps([dict(zip(FEATURES, row)) for row in rows.tolist()])),
+    "batch_columns": ("/predict/batch/columns", "application/json", True,
+                      lambda rows: json.dumps({f: rows[:, j].tolist() for j, f in enumerate(FEATURES)})),
+    "batch_array": ("/predict/batch/array", "application/json", True,
+                    lambda rows: json.dumps({"rows": rows.tolist()})),
+    "batch_tensor": ("/predict/batch", "application/x-float32-matrix", True, tensor_body),
+}
+
+
+# ==============================================================
+# Server
+# ==============================================================
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def wait_healthy(host: str, port: int, timeout: float) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            conn = http.client.HTTPConnection(host, port, timeout=2)
+            conn.request("GET", "/health")
+            if conn.getresponse().status == 200:
+                return
+        except OSError:
+            pass
+        time.sleep(0.25)
+    raise TimeoutError(f"Server on {host}:{port} did not become healthy within {timeout}s.")
+
+
+def start_server(port: int, env: dict, timeout: float) -> subprocess.Popen:
+    """Run the app under uvicorn from the project root (so models/ resolves)."""
+    command = [
+        sys.executable, "-m", "uvicorn", "app:app",
+        "--app-dir", os.path.join(ROOT, "src", "backend"),
+        "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning",
+    ]
+    server = subprocess.Popen(command, cwd=os.getcwd(), env={**os.environ, **env})
+    try:
+        wait_healthy("127.0.0.1", port, timeout)
+    except Exception:
+        server.terminate()
+        raise
+    return server
+
+
+# ==============================================================
+# Load Generation
+# ==============================================================
+def drive(host: str, port: int, path: str, content_type: str, bodies: list, concurrency: int, n_requests: int):
+    """Send ``n_requests`` POSTs over ``concurrency`` keep-alive connections."""
+    counter = itertools.count()
+    headers = {"Content-Type": content_type, "Accept": content_type}
+
+    def client():
+        conn = http.client.HTTPConnection(host, port, timeout=120)
+        latencies, errors = [], 0
+        while (i := next(counter)) < n_requests:
+            started = time.perf_counter()
+            conn.request("POST", path, bodies[i % len(bodies)], headers)
+            response = conn.getresponse()
+            response.read()
+            latencies.append(time.perf_counter() - started)
+            errors += response.status != 200
+        conn.close()
+        return latencies, errors
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(lambda _: client(), range(concurrency)))
+    wall = time.perf_counter() - started
+    latencies = np.concatenate([np.asarray(r[0]) for r in results])
+    return latencies, sum(r[1] for r in results), wall
+
+
+def latency_summary(seconds: np.ndarray) -> dict:
+    ms = seconds * 1000
+    return {
+        "p50_ms": round(float(np.percentile(ms, 50)), 3),
+        "p95_ms": round(float(np.percentile(ms, 95)), 3),
+        "p99_ms": round(float(np.percentile(ms, 99)), 3),
+        "mean_ms": round(float(ms.mean()), 3),
+        "max_ms": round(float(ms.max()), 3),
+    }
+
+
+def encoded_bodies(build, rows: np.ndarray, batch_size: int, count: int) -> list:
+    """Up to ``count`` request bodies of ``batch_size`` consecutive rows each."""
+    starts = range(0, max(1, len(rows) - batch_size + 1), batch_size)
+    bodies = [build(rows[s:s + batch_size]) for s in itertools.islice(starts, count)]
+    return [body.encode("utf-8") if isinstance(body, str) else body for body in bodies]
+
+
+def run_load(host: str, port: int, args) -> list:
+    scenarios = []
+    seeds = itertools.count()
+    for name in args.routes:
+        path, content_type, batched, build = ROUTES[name]
+        pool = sample_rows(args.pool_rows, args.data, seed=next(seeds))
+        for batch_size in (args.batch_sizes if batched else [1]):
+            bodies = encoded_bodies(build, pool, batch_size, args.payloads)
+            for concurrency in args.concurrency:
+                if not batched:
+                    # Fresh rows for every single-row request, so /predict
+                    # measures the model path rather than its shared cache
+                    n_rows = args.warmup + args.requests
+                    rows = sample_rows(n_rows, args.data, seed=next(seeds))
+                    bodies = encoded_bodies(build, rows, 1, n_rows)
+                drive(host, port, path, content_type, bodies[:args.warmup], concurrency, args.warmup)
+                latencies, errors, wall = drive(
+                    host, port, path, content_type, bodies[args.warmup:] if not batched else bodies,
+                    concurrency, args.requests,
+                )
+                scenario = {
+                    "route": name,
+                    "path": path,
+                    "content_type": content_type,
+                    "batch_size": batch_size,
+                    "concurrency": concurrency,
+                    "requests": len(latencies),
+                    "errors": int(errors),
+                    "requests_per_s": round(len(latencies) / wall, 2),
+                    "rows_per_s": round(len(latencies) * batch_size / wall, 1),
+                    **latency_summary(latencies),
+                }
+                scenarios.append(scenario)
+                print(
+                    f"{name:14s} batch={batch_size:<6d} c={concurrency:<4d} "
+                    f"{scenario['requests_per_s']:>9.1f} req/s  p50={scenario['p50_ms']}ms "
+                    f"p95={scenario['p95_ms']}ms p99={scenario['p99_ms']}ms errors={errors}"
+                )
+    return scenarios
+
+
+# ==============================================================
+# Microbenchmarks
+# ==============================================================
+def bench_model_load(repeats: int) -> list:
+    results = []
+    for path in MODEL_ARTIFACTS:
+        if not os.path.exists(path):
+            continue
+        engines = [False, True] if path.endswith(".pkl") else [True]
+        for vectorized in engines:
+            timings = []
+            for _ in range(repeats):
+                started = time.perf_counter()
+                load_artifact(path, vectorized=vectorized)
+                timings.append(time.perf_counter() - started)
+            results.append({
+                "artifact": path,
+                "engine": "vectorized" if vectorized else "sklearn",
+                "min_ms": round(min(timings) * 1000, 3),
+                "median_ms": round(float(np.median(timings)) * 1000, 3),
+            })
+            print(f"load {path:24s} {results[-1]['engine']:10s} median={results[-1]['median_ms']}ms")
+    return results
+
+
+def predict_engines(path: str) -> list:
+    """(engine, vectorized, vectorized_max_rows) variants to time for an artifact.
+
+    "vectorized" always walks the flat arrays, "dispatch" is the served
+    default (sklearn above DEFAULT_VECTORIZED_MAX_ROWS rows) and "sklearn"
+    is the pickled estimator as is.
+    """
+    engines = [("vectorized", True, None), ("dispatch", True, DEFAULT_VECTORIZED_MAX_ROWS)]
+    if path.endswith(".pkl"):
+        engines.append(("sklearn", False, None))
+    return engines
+
+
+def bench_predict(batch_sizes: list, repeats: int, data_path: str = None) -> list:
+    """Per-call and per-row predict_proba cost for each artifact, engine and batch size."""
+    results = []
+    rows = sample_rows(max(batch_sizes + [1]), data_path)
+    for path in MODEL_ARTIFACTS:
+        if not os.path.exists(path):
+            continue
+        for engine, vectorized, max_rows in predict_engines(path):
+            model = load_artifact(path, vectorized=vectorized, vectorized_max_rows=max_rows)
+            order = column_order(model, FEATURES)
+            for batch_size in [1] + [b for b in batch_sizes if b > 1]:
+                batch = rows[:batch_size]
+                model.predict_proba(model_input(model, batch, order))
+                timings = []
+                for _ in range(max(3, repeats // batch_size)):
+                    started = time.perf_counter()
+                    model.predict_proba(model_input(model, batch, order))
+                    timings.append(time.perf_counter() - started)
+                median = float(np.median(timings))
+                results.append({
+                    "artifact": path,
+                    "engine": engine,
+                    "batch_size": batch_size,
+                    "call_ms_p50": round(median * 1000, 4),
+                    "row_us": round(median / batch_size * 1e6, 3),
+                })
+                print(
+                    f"predict {path:24s} {engine:10s} batch={batch_size:<6d} "
+                    f"{results[-1]['call_ms_p50']}ms/call {results[-1]['row_us']}us/row"
+                )
+    return results
+
+
+# ==============================================================
+# Reporting
+# ==============================================================
+def git_commit() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, text=True).strip()
+    except Exception:
+        return None
+
+
+def compare(current: dict, baseline_path: str) -> None:
+    """Print the relative change of each scenario against an earlier run."""
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    key = lambda s: (s["route"], s["batch_size"], s["concurrency"])  # noqa: E731
+    previous = {key(s): s for s in baseline.get("server", [])}
+    print(f"\nChange vs {baseline_path} (commit {baseline.get('git_commit')}):")
+    for scenario in current["server"]:
+        old = previous.get(key(scenario))
+        if old is None:
+            continue
+        deltas = "  ".join(
+            f"{metric} {100 * (scenario[metric] - old[metric]) / old[metric]:+.1f}%"
+            for metric in ("requests_per_s", "p50_ms", "p99_ms")
+            if old[metric]
+        )
+        print(f"{scenario['route']:14s} batch={scenario['batch_size']:<6d} c={scenario['concurrency']:<4d} {deltas}")
+
+
+def int_list(value: str) -> list:
+    return [int(v) for v in value.split(",") if v]
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark the prediction API and model inference.")
+    parser.add_argument("--url", help="Benchmark a running server instead of starting one")
+    parser.add_argument("--routes", default=",".join(ROUTES), type=lambda v: v.split(","),
+                        help=f"Comma separated routes from {list(ROUTES)}")
+    parser.add_argument("--concurrency", default="1,8,32", type=int_list)
+    parser.add_argument("--batch-sizes", default="10,100,1000", type=int_list)
+    parser.add_argument("--requests", default=500, type=int, help="Requests per scenario")
+    parser.add_argument("--warmup", default=20, type=int, help="Unmeasured requests per scenario")
+    parser.add_argument("--payloads", default=200, type=int, help="Distinct bodies per batch scenario")
+    parser.add_argument("--pool-rows", default=20000, type=int, help="Rows payloads are drawn from")
+    parser.add_argument("--data", help="Parquet/CSV file to draw request rows from")
+    parser.add_argument("--env", action="append", default=[], help="KEY=VALUE for the started server")
+    parser.add_argument("--startup-timeout", default=120.0, type=float)
+    parser.add_argument("--load-repeats", default=5, type=int)
+    parser.add_argument("--predict-repeats", default=2000, type=int)
+    parser.add_argument("--predict-batch-sizes", default="10,100,1000,4096,10000", type=int_list,
+                        help="Batch sizes for the in-process predict_proba benchmark")
+    parser.add_argument("--skip-server", action="store_true", help="Only run the microbenchmarks")
+    parser.add_argument("--skip-micro", action="store_true", help="Only run the load test")
+    parser.add_argument("--baseline", help="Earlier result file to compare against")
+    parser.add_argument("--output", default=os.path.join("reports", "benchmark.json"))
+    args = parser.parse_args()
+    unknown = [name for name in args.routes if name not in ROUTES]
+    if unknown:
+        parser.error(f"Unknown routes {unknown}; choose from {list(ROUTES)}")
+    return args
+
+
+def main():
+    args = parse_args()
+    report = {
+        "git_commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "config": {key: value for key, value in vars(args).items() if key not in ("baseline", "output")},
+        "server": [],
+        "model_load": [],
+        "predict": [],
+    }
+
+    if not args.skip_micro:
+        report["model_load"] = bench_model_load(args.load_repeats)
+        report["predict"] = bench_predict(args.predict_batch_sizes, args.predict_repeats, args.data)
+
+    if not args.skip_server:
+        server = None
+        if args.url:
+            parsed = urlparse(args.url)
+            host, port = parsed.hostname, parsed.port or 80
+        else:
+            host, port = "127.0.0.1", free_port()
+            env = dict(item.split("=", 1) for item in args.env)
+            started = time.perf_counter()
+            server = start_server(port, env, args.startup_timeout)
+            report["server_startup_seconds"] = round(time.perf_counter() - started, 3)
+        try:
+            report["server"] = run_load(host, port, args)
+        finally:
+            if server is not None:
+                server.terminate()
+                server.wait(timeout=30)
+
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=4)
+    print(f"Results written to {args.output}")
+
+    if args.baseline:
+        compare(report, args.baseline)
+
+
+if __name__ == "__main__":
+    main()
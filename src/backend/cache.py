@@ -0,0 +1,147 @@
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Sequence
+
+import numpy as np
+
+
+def parse_quantization(spec: str) -> Dict[str, float]:
+    """Parse ``"ph=0.01,Solids=1"`` into ``{"ph": 0.01, "Solids": 1.0}``."""
+    steps = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        name, _, step = item.partition("=")
+        step = float(step)
+        if step <= 0:
+            raise ValueError(f"Quantization step for '{name}' must be positive.")
+        steps[name.strip()] = step
+    return steps
+
+
+class PredictionCache:
+    """In-process LRU + TTL cache of prediction results.
+
+    Keys are the feature values in ``features`` order. Features listed in
+    ``quantization`` are snapped to a grid of the given step first, so
+    readings that differ only by sensor noise share an entry. The cache is
+    bounded by ``max_entries`` and, optionally, ``max_bytes`` (an estimate
+    of key + value size); the least recently used entries are evicted first.
+
+    ``clear`` bumps ``generation``. Callers that compute a value outside the
+    cache pass the generation they started with to ``put``, so results of a
+    model that was replaced in the meantime are never stored.
+    """
+
+    def __init__(
+        self,
+        features: Sequence[str],
+        max_entries: int = 100_000,
+        max_bytes: Optional[int] = None,
+        ttl_seconds: Optional[float] = None,
+        quantization: Optional[Dict[str, float]] = None,
+    ):
+        quantization = quantization or {}
+        unknown = set(quantization) - set(features)
+        if unknown:
+            raise ValueError(f"Quantization given for unknown features: {sorted(unknown)}")
+
+        self.features = list(features)
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl_seconds
+        self.quantization = quantization
+        self._steps = [quantization.get(feature) for feature in self.features]
+
+        self._entries: OrderedDict = OrderedDict()  # key -> (value, stored_at, size)
+        self._lock = threading.Lock()
+        self.generation = 0
+        self.bytes = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    def key(self, values: Sequence[float]) -> tuple:
+        """Cache key for one sample's feature values."""
+        return tuple(
+            value if step is None else round(value / step)
+            for value, step in zip(values, self._steps)
+        )
+
+    def get(self, key: tuple) -> Optional[np.ndarray]:
+        if not self.enabled:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            value, stored_at, size = entry
+            if self.ttl is not None and time.monotonic() - stored_at > self.ttl:
+                del self._entries[key]
+                self.bytes -= size
+                self.expirations += 1
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: tuple, value: np.ndarray, generation: Optional[int] = None) -> None:
+        if not self.enabled:
+            return
+        # Own copy: batch results are views that would keep the whole batch alive
+        value = np.array(value, copy=True)
+        size = sys.getsizeof(key) + value.nbytes + 64  # + OrderedDict node overhead
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return  # computed by a model that has since been replaced
+
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.bytes -= old[2]
+            self._entries[key] = (value, time.monotonic(), size)
+            self.bytes += size
+
+            while len(self._entries) > self.max_entries or (
+                self.max_bytes is not None and self.bytes > self.max_bytes and len(self._entries) > 1
+            ):
+                _, (_, _, evicted_size) = self._entries.popitem(last=False)
+                self.bytes -= evicted_size
+                self.evictions += 1
+
+    def clear(self) -> None:
+        """Drop every entry (e.g. when a new model is loaded)."""
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+            self.generation += 1
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "entries": len(self),
+            "bytes": self.bytes,
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+            "ttl_seconds": self.ttl,
+            "quantization": self.quantization,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "generation": self.generation,
+        }
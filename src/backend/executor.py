@@ -0,0 +1,110 @@
+import asyncio
+import logging
+import multiprocessing
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Callable, List, Optional
+
+import numpy as np
+
+from src.models.forest_format import (
+    DEFAULT_VECTORIZED_MAX_ROWS,
+    column_order,
+    load_artifact,
+    model_input,
+)
+
+logger = logging.getLogger(__name__)
+
+EXECUTOR_MODES = ("thread", "process")
+
+
+# ==============================================================
+# Process Pool Worker State
+# ==============================================================
+# Each worker process loads the model exactly once, in the pool
+# initializer, and keeps it here for every task it runs afterwards.
+_worker_model = None
+_worker_order: Optional[np.ndarray] = None
+
+
+def _init_worker(
+    model_path: str, features: List[str], vectorized: bool, vectorized_max_rows: Optional[int]
+) -> None:
+    """Process pool initializer: load the model once per worker."""
+    global _worker_model, _worker_order
+    _worker_model = load_artifact(model_path, vectorized=vectorized, vectorized_max_rows=vectorized_max_rows)
+    _worker_order = column_order(_worker_model, features)
+    logger.info(f"Inference worker {os.getpid()} loaded model from {model_path}")
+
+
+def _worker_predict_proba(rows: np.ndarray) -> np.ndarray:
+    return _worker_model.predict_proba(model_input(_worker_model, rows, _worker_order))
+
+
+# ==============================================================
+# Inference Executor
+# ==============================================================
+class InferenceExecutor:
+    """Run CPU-bound model inference off the event loop.
+
+    ``thread`` mode calls ``predict_fn`` (which uses the model already loaded
+    in this process) on a thread pool; the forest releases the GIL while
+    walking trees, so threads scale across cores. ``process`` mode starts a
+    process pool whose workers each load ``model_path`` once at start-up
+    (a memory-mapped forest export is shared between them via the page cache).
+    """
+
+    def __init__(
+        self,
+        predict_fn: Callable[[np.ndarray], np.ndarray],
+        mode: str = "thread",
+        workers: Optional[int] = None,
+        model_path: Optional[str] = None,
+        features: Optional[List[str]] = None,
+        vectorized: bool = False,
+        vectorized_max_rows: Optional[int] = DEFAULT_VECTORIZED_MAX_ROWS,
+    ):
+        if mode not in EXECUTOR_MODES:
+            raise ValueError(f"Unknown executor mode '{mode}'. Expected one of {EXECUTOR_MODES}.")
+        if mode == "process" and model_path is None:
+            raise ValueError("Process executor requires a model_path to load in each worker.")
+
+        self.predict_fn = predict_fn
+        self.mode = mode
+        self.workers = workers or os.cpu_count() or 1
+        self.model_path = model_path
+        self.features = features or []
+        self.vectorized = vectorized
+        self.vectorized_max_rows = vectorized_max_rows
+        self._pool: Optional[Executor] = None
+
+    def start(self) -> None:
+        if self._pool is not None:
+            return
+        if self.mode == "thread":
+            self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="inference")
+        else:
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(self.model_path, self.features, self.vectorized, self.vectorized_max_rows),
+            )
+        logger.info(f"Inference executor started ({self.mode}, {self.workers} workers)")
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Stop the pool; with ``wait`` running tasks are allowed to finish."""
+        if self._pool is not None:
+            self._pool.shutdown(wait=wait, cancel_futures=not wait)
+            self._pool = None
+
+    async def run(self, rows: np.ndarray) -> np.ndarray:
+        """predict_proba for ``rows`` on the pool, without blocking the event loop."""
+        if self._pool is None:
+            raise RuntimeError("InferenceExecutor is not running.")
+        fn = self.predict_fn if self.mode == "thread" else _worker_predict_proba
+        return await asyncio.get_running_loop().run_in_executor(self._pool, fn, rows)
+
+    def info(self) -> dict:
+        return {"mode": self.mode, "workers": self.workers}
@@ -0,0 +1,209 @@
+"""Minimal Prometheus-style metrics for the backend.
+
+Counters, gauges and histograms are kept in process memory and rendered in
+the Prometheus text exposition format by ``MetricsRegistry.render``. With
+several gunicorn workers each worker reports its own values; scrape them
+per worker (or aggregate in Prometheus by instance).
+"""
+import bisect
+import resource
+import threading
+import time
+from collections import defaultdict
+from typing import Callable, Dict, Iterable, List, Sequence, Tuple
+
+# Seconds; fine-grained at the low end where single predictions sit
+LATENCY_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024, 4096, 16384)
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{value}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+# ==============================================================
+# Metric Types
+# ==============================================================
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._values: Dict[Tuple[str, ...], float] = defaultdict(float)
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values: str, amount: float = 1.0) -> None:
+        with self._lock:
+            self._values[tuple(label_values)] += amount
+
+    def samples(self) -> Iterable[str]:
+        for label_values, value in sorted(self._values.items()):
+            yield f"{self.name}{_format_labels(self.labels, label_values)} {_format_value(value)}"
+
+
+class Gauge:
+    """Metric whose value is read from ``fn`` at scrape time.
+
+    ``kind`` may be set to "counter" for monotonically increasing values
+    that are tracked elsewhere (e.g. cache hit counts).
+    """
+
+    def __init__(self, name: str, help: str, fn: Callable[[], float], kind: str = "gauge"):
+        self.name = name
+        self.help = help
+        self.fn = fn
+        self.kind = kind
+
+    def samples(self) -> Iterable[str]:
+        value = self.fn()
+        if value is not None:
+            yield f"{self.name} {_format_value(value)}"
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labels: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.buckets = tuple(sorted(buckets))
+        # label values -> (per-bucket counts incl. +Inf, sum, count)
+        self._series: Dict[Tuple[str, ...], list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *label_values: str, count: int = 1) -> None:
+        key = tuple(label_values)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += count
+            series[1] += value * count
+            series[2] += count
+
+    def samples(self) -> Iterable[str]:
+        for label_values, (counts, total, count) in sorted(self._series.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = f'le="{_format_value(bound)}"'
+                yield f"{self.name}_bucket{_format_labels(self.labels, label_values, le)} {cumulative}"
+            labels = _format_labels(self.labels, label_values)
+            yield f"{self.name}_sum{labels} {_format_value(total)}"
+            yield f"{self.name}_count{labels} {count}"
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: List = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name: str, help: str, labels: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, help, labels))
+
+    def gauge(self, name: str, help: str, fn: Callable[[], float], kind: str = "gauge") -> Gauge:
+        return self.register(Gauge(name, help, fn, kind))
+
+    def histogram(self, name: str, help: str, labels: Sequence[str] = (), buckets=LATENCY_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, help, labels, buckets))
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+
+# ==============================================================
+# Process / Request Helpers
+# ==============================================================
+def process_rss_bytes() -> float:
+    """Current resident set size (Linux), else the peak RSS."""
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return float(pages * resource.getpagesize())
+    except (OSError, IndexError, ValueError):
+        # ru_maxrss is KiB on Linux, bytes on macOS; peak rather than current
+        return float(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024)
+
+
+class PhaseTimer:
+    """Time consecutive phases of one request into a histogram.
+
+    Created by ``MetricsMiddleware`` when the request arrives; each ``mark``
+    records the time since the previous mark under the given phase name.
+    The middleware records the final ``serialize`` phase when the response
+    starts.
+    """
+
+    def __init__(self, histogram: Histogram):
+        self.histogram = histogram
+        self.route = None
+        self.last = time.perf_counter()
+
+    def mark(self, phase: str) -> None:
+        now = time.perf_counter()
+        if self.route is not None:
+            self.histogram.observe(now - self.last, self.route, phase)
+        self.last = now
+
+
+class MetricsMiddleware:
+    """ASGI middleware: per-route request counts and latency, phase timers."""
+
+    def __init__(self, app, requests: Counter, latency: Histogram, phases: Histogram):
+        self.app = app
+        self.requests = requests
+        self.latency = latency
+        self.phases = phases
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        timer = PhaseTimer(self.phases)
+        scope.setdefault("state", {})["timer"] = timer
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+                timer.mark("serialize")
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            path = getattr(route, "path", "unmatched")
+            self.requests.inc(path, scope["method"], str(status["code"]))
+            self.latency.observe(time.perf_counter() - start, path)
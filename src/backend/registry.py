@@ -0,0 +1,233 @@
+import asyncio
+import hashlib
+import logging
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Optional
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+
+def artifact_fingerprint(path: Path, exclude: tuple = ()) -> str:
+    """Short version id derived from the artifact's files, sizes and mtimes.
+
+    Files named in ``exclude`` (inside an artifact directory) are ignored.
+    """
+    path = Path(path)
+    files = sorted(p for p in path.rglob("*") if p.is_file()) if path.is_dir() else [path]
+    files = [file for file in files if file.name not in exclude]
+    digest = hashlib.sha1()
+    for file in files:
+        stat = file.stat()
+        digest.update(f"{file.relative_to(path.parent)}:{stat.st_size}:{stat.st_mtime_ns}".encode())
+    return digest.hexdigest()[:12]
+
+
+class ReloadInProgress(Exception):
+    """Raised when a reload is requested while another one is running."""
+
+
+class ModelVersion:
+    """A loaded model plus the executor serving it and its in-flight count.
+
+    ``imputer`` holds the training medians shipped with the model (if any),
+    so a reload swaps both together. ``threshold`` is the decision threshold
+    on the positive-class probability; ``weights_version`` identifies the
+    model's parameters alone, so a reload that only changes the threshold
+    can be told apart from a new model.
+    """
+
+    def __init__(self, model, info: dict, version: str, imputer=None, threshold: float = 0.5,
+                 weights_version: Optional[str] = None):
+        self.model = model
+        self.info = info
+        self.version = version
+        self.imputer = imputer
+        self.threshold = threshold
+        self.weights_version = weights_version or version
+        self.loaded_at = time.time()
+        self.load_seconds = None
+        self.executor = None
+        self.in_flight = 0
+
+    def describe(self) -> dict:
+        return {
+            **self.info,
+            "version": self.version,
+            "load_seconds": round(self.load_seconds, 4) if self.load_seconds is not None else None,
+            "loaded_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(self.loaded_at)),
+        }
+
+
+class ModelRegistry:
+    """Hold the active model and swap in new versions without downtime.
+
+    ``reload`` loads the new artifact on a worker thread, warms it (and its
+    executor) with the ``warmup`` samples, then replaces ``current`` in a single
+    assignment. Requests take the version they started with via
+    ``acquire``; the previous version's executor is shut down only once its
+    in-flight count has drained (or ``drain_timeout`` has passed).
+    """
+
+    def __init__(
+        self,
+        loader: Callable[[], ModelVersion],
+        executor_factory: Callable[[ModelVersion], object],
+        warmup: pd.DataFrame,
+        on_swap: Optional[Callable[[ModelVersion, Optional[ModelVersion]], None]] = None,
+        drain_timeout: float = 30.0,
+    ):
+        self.loader = loader
+        self.executor_factory = executor_factory
+        self.warmup = warmup
+        self.on_swap = on_swap
+        self.drain_timeout = drain_timeout
+
+        self.current: Optional[ModelVersion] = None
+        self.reloads = 0
+        self.last_error: Optional[str] = None
+        self._reload_lock = asyncio.Lock()
+        self._retiring: set = set()
+        self._watch_task: Optional[asyncio.Task] = None
+
+    # ----------------------------------------------------------
+    # Loading
+    # ----------------------------------------------------------
+    def load(self) -> ModelVersion:
+        """Load and warm a new version without activating it (blocking)."""
+        started = time.perf_counter()
+        version = self.loader()
+        version.load_seconds = time.perf_counter() - started
+        version.model.predict_proba(self.warmup)
+        return version
+
+    def activate(self, version: ModelVersion) -> Optional[ModelVersion]:
+        """Make ``version`` current and return the one it replaces."""
+        old, self.current = self.current, version
+        if self.on_swap is not None:
+            self.on_swap(version, old)
+        logger.info(f"Model version {version.version} is now active")
+        return old
+
+    def start_executor(self, version: ModelVersion) -> None:
+        if version.executor is None:
+            version.executor = self.executor_factory(version)
+            version.executor.start()
+
+    async def reload(self) -> ModelVersion:
+        """Load, warm and atomically swap in the latest model artifact."""
+        if self._reload_lock.locked():
+            raise ReloadInProgress("A model reload is already in progress.")
+
+        async with self._reload_lock:
+            loop = asyncio.get_running_loop()
+            version = None
+            try:
+                version = await loop.run_in_executor(None, self.load)
+                self.start_executor(version)
+                # Warm the executor too (spawns process-pool workers)
+                await version.executor.run(self.warmup.to_numpy(dtype=np.float64))
+            except BaseException as e:  # includes cancellation at shutdown
+                self.last_error = str(e)
+                if version is not None and version.executor is not None:
+                    version.executor.shutdown(wait=False)
+                raise
+
+            old = self.activate(version)
+            self.reloads += 1
+            self.last_error = None
+            if old is not None:
+                task = asyncio.create_task(self._retire(old))
+                self._retiring.add(task)
+                task.add_done_callback(self._retiring.discard)
+            return version
+
+    async def _retire(self, version: ModelVersion) -> None:
+        """Release an old version once its in-flight requests have finished."""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.drain_timeout
+        while version.in_flight > 0 and loop.time() < deadline:
+            await asyncio.sleep(0.05)
+        if version.in_flight > 0:
+            logger.warning(f"Retiring model {version.version} with {version.in_flight} requests still running")
+        if version.executor is not None:
+            await loop.run_in_executor(None, version.executor.shutdown, True)
+        logger.info(f"Model version {version.version} retired")
+
+    # ----------------------------------------------------------
+    # Requests
+    # ----------------------------------------------------------
+    @contextmanager
+    def acquire(self):
+        """Pin the current version for the duration of one inference call."""
+        version = self.current
+        if version is None:
+            raise RuntimeError("No model loaded.")
+        version.in_flight += 1
+        try:
+            yield version
+        finally:
+            version.in_flight -= 1
+
+    # ----------------------------------------------------------
+    # File Watcher
+    # ----------------------------------------------------------
+    def watch(self, locate: Callable[[], Path], interval: float) -> None:
+        """Poll the model artifact and reload when it changes."""
+        if self._watch_task is None:
+            self._watch_task = asyncio.create_task(self._watch(locate, interval))
+
+    async def _watch(self, locate: Callable[[], Path], interval: float) -> None:
+        pending = None
+        failed = None
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                fingerprint = artifact_fingerprint(locate())
+            except (FileNotFoundError, OSError):
+                continue
+
+            if self.current is not None and fingerprint == self.current.version:
+                pending = None
+                continue
+            # Reload only once the artifact has stayed the same for a full
+            # interval, so a file that is still being written is skipped
+            if fingerprint != pending:
+                pending = fingerprint
+                continue
+            if fingerprint == failed:
+                continue
+
+            logger.info(f"Model artifact changed ({fingerprint}); reloading")
+            try:
+                await self.reload()
+            except ReloadInProgress:
+                continue
+            except Exception as e:
+                failed = fingerprint
+                logger.error(f"❌ Hot reload failed, keeping the current model: {e}")
+
+    async def shutdown(self) -> None:
+        """Stop the watcher and every executor (after draining)."""
+        if self._watch_task is not None:
+            self._watch_task.cancel()
+            self._watch_task = None
+        if self._retiring:
+            await asyncio.gather(*self._retiring)
+        if self.current is not None and self.current.executor is not None:
+            self.current.executor.shutdown(wait=True)
+            self.current.executor = None
+
+    def stats(self) -> dict:
+        return {
+            "version": self.current.version if self.current else None,
+            "reloads": self.reloads,
+            "reloading": self._reload_lock.locked(),
+            "retiring": len(self._retiring),
+            "in_flight": self.current.in_flight if self.current else 0,
+            "last_error": self.last_error,
+        }
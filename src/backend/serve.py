@@ -0,0 +1,75 @@
+"""Production entry point for the FastAPI backend.
+
+Runs the app under gunicorn with uvicorn workers. The model is loaded once
+in the master process before the workers are forked, so every worker shares
+the same model pages copy-on-write instead of unpickling its own copy.
+
+Configuration (environment variables):
+    HOST, PORT         Bind address (default 0.0.0.0:8000)
+    SERVER_WORKERS     Number of worker processes (default: CPU count)
+    GRACEFUL_TIMEOUT   Seconds a worker gets to drain in-flight requests
+                       after SIGTERM before it is killed (default 30)
+    WORKER_TIMEOUT     Seconds of silence before a worker is restarted
+                       (default 120)
+"""
+import gc
+import logging
+import os
+
+from gunicorn.app.base import BaseApplication
+
+import app as backend
+
+logger = logging.getLogger(__name__)
+
+
+class ProductionServer(BaseApplication):
+    """Gunicorn application wrapping an already imported ASGI app."""
+
+    def __init__(self, application, options: dict):
+        self.application = application
+        self.options = options
+        super().__init__()
+
+    def load_config(self):
+        for key, value in self.options.items():
+            if key in self.cfg.settings and value is not None:
+                self.cfg.set(key, value)
+
+    def load(self):
+        return self.application
+
+
+def server_options() -> dict:
+    host = os.getenv("HOST", "0.0.0.0")
+    port = os.getenv("PORT", "8000")
+    return {
+        "bind": f"{host}:{port}",
+        "workers": int(os.getenv("SERVER_WORKERS", str(os.cpu_count() or 1))),
+        "worker_class": "uvicorn.workers.UvicornWorker",
+        # Import the app (and therefore the model) in the master before forking
+        "preload_app": True,
+        # SIGTERM: stop accepting, finish in-flight requests, run the app's
+        # shutdown handlers (flush micro-batches, stop inference pool)
+        "graceful_timeout": int(os.getenv("GRACEFUL_TIMEOUT", "30")),
+        "timeout": int(os.getenv("WORKER_TIMEOUT", "120")),
+        "accesslog": "-",
+    }
+
+
+def main():
+    if not backend.load_model():
+        raise SystemExit("Model could not be loaded; refusing to start workers.")
+
+    # Move everything allocated so far (model included) out of the garbage
+    # collector's generations so collections in the workers don't write to
+    # those pages and break copy-on-write sharing.
+    gc.freeze()
+
+    options = server_options()
+    logger.info(f"Starting production server on {options['bind']} with {options['workers']} workers")
+    ProductionServer(backend.app, options).run()
+
+
+if __name__ == "__main__":
+    main()
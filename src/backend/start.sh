@@ -6,4 +6,5 @@ echo "Downloading the model"
 python setup.py
 
 echo "Starting FastAPI server"
-python app.py
+# exec so SIGTERM reaches gunicorn and workers drain gracefully
+exec python serve.py
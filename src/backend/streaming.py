@@ -0,0 +1,149 @@
+import json
+from typing import AsyncIterator, List, Sequence
+
+import numpy as np
+from fastapi.responses import StreamingResponse
+
+STREAM_FORMATS = {
+    "application/x-ndjson": "ndjson",
+    "application/jsonl": "ndjson",
+    "text/csv": "csv",
+}
+
+
+class StreamFormatError(ValueError):
+    """Malformed record in a streamed upload."""
+
+    def __init__(self, line_number: int, message: str):
+        super().__init__(f"line {line_number}: {message}")
+        self.line_number = line_number
+
+
+class DuplexStreamingResponse(StreamingResponse):
+    """StreamingResponse whose body is produced while the request body is read.
+
+    The stock response listens for client disconnects by calling ``receive``
+    in a background task, which would steal request body messages from the
+    generator reading the upload. Here the generator is the only reader;
+    a disconnect surfaces as ``ClientDisconnect`` from ``request.stream()``.
+    """
+
+    async def __call__(self, scope, receive, send):
+        await self.stream_response(send)
+        if self.background is not None:
+            await self.background()
+
+
+def stream_format(content_type: str) -> str:
+    """Map a Content-Type header to "ndjson" or "csv" (KeyError if unsupported)."""
+    return STREAM_FORMATS[content_type.split(";")[0].strip().lower()]
+
+
+async def iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    """Split an async byte stream into lines, holding at most one partial line."""
+    pending = b""
+    async for chunk in chunks:
+        if not chunk:
+            continue
+        lines = (pending + chunk).split(b"\n")
+        pending = lines.pop()
+        for line in lines:
+            if line.strip():
+                yield line.rstrip(b"\r")
+    if pending.strip():
+        yield pending.rstrip(b"\r")
+
+
+def parse_value(value) -> float:
+    """Feature value as a float; None (missing) becomes NaN."""
+    return np.nan if value is None else float(value)
+
+
+class RowParser:
+    """Parse NDJSON objects or CSV rows into feature rows in ``features`` order.
+
+    CSV input must start with a header row; columns may be in any order and
+    extra columns (e.g. ``Potability``) are ignored. Missing values (an
+    omitted or null NDJSON field, an empty CSV field) are parsed as NaN and
+    imputed by the caller, as on the other prediction routes.
+    """
+
+    def __init__(self, fmt: str, features: Sequence[str]):
+        self.fmt = fmt
+        self.features = list(features)
+        self.columns: List[int] = []
+        self.line_number = 0
+
+    def parse(self, line: bytes):
+        """Row of floats for a data line, or None for the CSV header."""
+        self.line_number += 1
+        try:
+            if self.fmt == "ndjson":
+                record = json.loads(line)
+                return [parse_value(record.get(feature)) for feature in self.features]
+
+            fields = line.decode("utf-8").split(",")
+            if not self.columns:
+                header = [field.strip().strip('"') for field in fields]
+                missing = [feature for feature in self.features if feature not in header]
+                if missing:
+                    raise ValueError(f"CSV header is missing columns {missing}")
+                self.columns = [header.index(feature) for feature in self.features]
+                return None
+            return [parse_value(fields[index].strip() or None) for index in self.columns]
+
+        except (KeyError, IndexError) as e:
+            raise StreamFormatError(self.line_number, f"missing field {e}")
+        except AttributeError:
+            raise StreamFormatError(self.line_number, "expected a JSON object")
+        except (ValueError, TypeError) as e:
+            raise StreamFormatError(self.line_number, str(e))
+
+
+async def iter_row_chunks(
+    chunks: AsyncIterator[bytes],
+    fmt: str,
+    features: Sequence[str],
+    chunk_rows: int,
+) -> AsyncIterator[np.ndarray]:
+    """Yield ``(n, len(features))`` float64 matrices of at most ``chunk_rows`` rows.
+
+    Only one chunk buffer (reused between chunks) and one partial input line
+    are held in memory, whatever the size of the upload. Each yielded matrix
+    must be consumed before the next one is requested. On a malformed line
+    the rows parsed before it are yielded first, then ``StreamFormatError``
+    is raised.
+    """
+    parser = RowParser(fmt, features)
+    buffer = np.empty((chunk_rows, len(features)), dtype=np.float64)
+    filled = 0
+
+    async for line in iter_lines(chunks):
+        try:
+            row = parser.parse(line)
+        except StreamFormatError:
+            if filled:
+                yield buffer[:filled]
+            raise
+        if row is None:
+            continue
+        buffer[filled] = row
+        filled += 1
+        if filled == chunk_rows:
+            yield buffer
+            filled = 0
+
+    if filled:
+        yield buffer[:filled]
+
+
+def format_results(fmt: str, predictions, probabilities, labels) -> bytes:
+    """Serialize one chunk of results as NDJSON lines or CSV rows."""
+    if fmt == "ndjson":
+        return "".join(
+            json.dumps({"prediction": int(p), "probability": float(q), "result": r}) + "\n"
+            for p, q, r in zip(predictions, probabilities, labels)
+        ).encode("utf-8")
+    return "".join(
+        f"{int(p)},{float(q)!r},{r}\n" for p, q, r in zip(predictions, probabilities, labels)
+    ).encode("utf-8")
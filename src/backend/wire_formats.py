@@ -0,0 +1,212 @@
+"""Binary request / response encodings for the batch prediction routes.
+
+Besides JSON, batch routes accept and return:
+
+``application/msgpack``
+    Request: a map with ``data`` (little-endian bytes of a row-major matrix),
+    ``shape`` ([n_samples, n_columns]), optional ``dtype`` ("float32", the
+    default, or "float64") and optional ``features`` (column names, default
+    FEATURES order). A plain ``rows`` list of lists is accepted too.
+    Response: a map with ``count``, ``predictions`` and ``probabilities``.
+
+``application/x-float32-matrix``
+    A 12-byte header -- magic ``b"F32M"``, then uint32 rows and uint32
+    columns, little-endian -- followed by the row-major float32 values.
+    Requests carry the features in FEATURES order (NaN = missing); responses
+    are an (n_samples, 2) matrix of prediction, probability.
+
+``application/vnd.apache.arrow.stream``
+    Request: an Arrow IPC stream (or file) with one column per feature, by
+    name (nulls = missing). Response: a stream with ``prediction`` (int8)
+    and ``probability`` (float64) columns.
+
+Matrix bodies are decoded with ``np.frombuffer`` on the request bytes, so
+no values are copied; Arrow columns are read zero-copy and gathered once
+into the row matrix.
+"""
+import struct
+from typing import Sequence
+
+import msgpack
+import numpy as np
+import pyarrow as pa
+import pyarrow.ipc as ipc
+
+CONTENT_TYPES = {
+    "json": "application/json",
+    "msgpack": "application/msgpack",
+    "tensor": "application/x-float32-matrix",
+    "arrow": "application/vnd.apache.arrow.stream",
+}
+WIRE_FORMATS = {
+    "application/json": "json",
+    "application/msgpack": "msgpack",
+    "application/x-msgpack": "msgpack",
+    "application/vnd.msgpack": "msgpack",
+    "application/x-float32-matrix": "tensor",
+    "application/vnd.apache.arrow.stream": "arrow",
+    "application/vnd.apache.arrow.file": "arrow",
+}
+
+TENSOR_MAGIC = b"F32M"
+TENSOR_HEADER = struct.Struct("<4sII")
+MSGPACK_DTYPES = {"float32": "<f4", "float64": "<f8"}
+
+
+class WireFormatError(ValueError):
+    """Malformed binary request body."""
+
+
+def media_type(header: str) -> str:
+    return header.split(";")[0].strip().lower()
+
+
+def request_format(content_type: str) -> str:
+    """Wire format of a request body; anything unrecognised is treated as JSON."""
+    return WIRE_FORMATS.get(media_type(content_type), "json")
+
+
+def response_format(accept: str) -> str:
+    """Preferred supported format in an Accept header (JSON by default)."""
+    choices = []
+    for position, part in enumerate(accept.split(",")):
+        kind, *options = part.split(";")
+        quality = 1.0
+        for option in options:
+            name, _, value = option.strip().partition("=")
+            if name == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        choices.append((-quality, position, media_type(kind)))
+
+    for quality, _, kind in sorted(choices):
+        if quality == 0:
+            break
+        if kind in WIRE_FORMATS:
+            return WIRE_FORMATS[kind]
+        if kind in ("*/*", "application/*"):
+            return "json"
+    return "json"
+
+
+# ==============================================================
+# Decoding
+# ==============================================================
+def decode_tensor(body: bytes, features: Sequence[str]) -> np.ndarray:
+    if len(body) < TENSOR_HEADER.size:
+        raise WireFormatError("Body is shorter than the float32 matrix header.")
+    magic, n_rows, n_cols = TENSOR_HEADER.unpack_from(body)
+    if magic != TENSOR_MAGIC:
+        raise WireFormatError(f"Bad float32 matrix magic {magic!r}; expected {TENSOR_MAGIC!r}.")
+    if n_cols != len(features):
+        raise WireFormatError(f"Expected {len(features)} columns in the order {list(features)}, got {n_cols}.")
+    if len(body) != TENSOR_HEADER.size + 4 * n_rows * n_cols:
+        raise WireFormatError(f"Body size does not match a {n_rows}x{n_cols} float32 matrix.")
+    return np.frombuffer(body, dtype="<f4", offset=TENSOR_HEADER.size).reshape(n_rows, n_cols)
+
+
+def msgpack_rows(payload: dict, features: Sequence[str]) -> tuple[np.ndarray, list]:
+    """``{"rows": [[...], ...]}`` payload: nested lists in ``features`` order."""
+    try:
+        rows = np.array(payload["rows"], dtype=np.float64)
+    except (TypeError, ValueError) as e:
+        raise WireFormatError(f"Invalid rows: {e}")
+    if rows.size == 0:
+        rows = rows.reshape(0, len(features))
+    return rows, list(features)
+
+
+def msgpack_matrix(payload: dict, features: Sequence[str]) -> tuple[np.ndarray, list]:
+    """``{"shape", "data", "dtype", "features"}`` payload: one packed matrix."""
+    try:
+        dtype = MSGPACK_DTYPES[payload.get("dtype", "float32")]
+        n_rows, n_cols = payload["shape"]
+        rows = np.frombuffer(payload["data"], dtype=dtype).reshape(n_rows, n_cols)
+    except KeyError as e:
+        raise WireFormatError(f"Missing or unsupported field {e} in MessagePack body.")
+    except (TypeError, ValueError) as e:
+        raise WireFormatError(f"Invalid matrix data: {e}")
+    return rows, payload.get("features") or list(features)
+
+
+def reorder_columns(rows: np.ndarray, columns: list, features: Sequence[str]) -> np.ndarray:
+    """Columns of ``rows`` (named ``columns``) permuted into ``features`` order."""
+    if rows.ndim != 2 or rows.shape[1] != len(columns):
+        raise WireFormatError(f"Expected {len(columns)} values per row, got shape {rows.shape}.")
+    if columns == list(features):
+        return rows
+    missing = [feature for feature in features if feature not in columns]
+    if missing:
+        raise WireFormatError(f"Missing features {missing}.")
+    return rows[:, [columns.index(feature) for feature in features]]
+
+
+def decode_msgpack(body: bytes, features: Sequence[str]) -> np.ndarray:
+    try:
+        payload = msgpack.unpackb(body, raw=False)
+    except Exception as e:
+        raise WireFormatError(f"Invalid MessagePack body: {e}")
+    if not isinstance(payload, dict):
+        raise WireFormatError("MessagePack body must be a map.")
+
+    decode = msgpack_rows if "rows" in payload else msgpack_matrix
+    return reorder_columns(*decode(payload, features), features)
+
+
+def decode_arrow(body: bytes, features: Sequence[str]) -> np.ndarray:
+    try:
+        source = pa.py_buffer(body)
+        reader = ipc.open_file(source) if body[:6] == b"ARROW1" else ipc.open_stream(source)
+        table = reader.read_all()
+    except pa.ArrowInvalid as e:
+        raise WireFormatError(f"Invalid Arrow IPC body: {e}")
+
+    missing = [feature for feature in features if feature not in table.column_names]
+    if missing:
+        raise WireFormatError(f"Missing feature columns {missing}.")
+    rows = np.empty((table.num_rows, len(features)), dtype=np.float64)
+    for j, feature in enumerate(features):
+        try:
+            rows[:, j] = table.column(feature).to_numpy()
+        except (pa.ArrowInvalid, TypeError, ValueError) as e:
+            raise WireFormatError(f"Column '{feature}' is not numeric: {e}")
+    return rows
+
+
+DECODERS = {"msgpack": decode_msgpack, "tensor": decode_tensor, "arrow": decode_arrow}
+
+
+def decode_rows(body: bytes, fmt: str, features: Sequence[str]) -> np.ndarray:
+    """(n_samples, len(features)) matrix in ``features`` order from a binary body.
+
+    The result may be a read-only view of ``body`` (copy before writing).
+    """
+    return DECODERS[fmt](body, features)
+
+
+# ==============================================================
+# Encoding
+# ==============================================================
+def encode_predictions(fmt: str, predictions: np.ndarray, probabilities: np.ndarray) -> bytes:
+    """Serialize batch results in a binary wire format."""
+    if fmt == "msgpack":
+        return msgpack.packb({
+            "count": len(predictions),
+            "predictions": predictions.tolist(),
+            "probabilities": probabilities.tolist(),
+        })
+    if fmt == "tensor":
+        matrix = np.column_stack([predictions, probabilities]).astype("<f4")
+        return TENSOR_HEADER.pack(TENSOR_MAGIC, *matrix.shape) + matrix.tobytes()
+    if fmt == "arrow":
+        table = pa.table({
+            "prediction": pa.array(predictions, type=pa.int8()),
+            "probability": pa.array(probabilities, type=pa.float64()),
+        })
+        sink = pa.BufferOutputStream()
+        with ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        return sink.getvalue().to_pybytes()
+    raise ValueError(f"Unknown wire format '{fmt}'.")
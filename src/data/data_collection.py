@@ -3,6 +3,9 @@ import pandas as pd
 from sklearn.model_selection import train_test_split
 import os
 import yaml
+from storage import PartitionWriter, dataset_path, iter_batches, write_table
+
+DATA_URL = "https://raw.githubusercontent.com/abideen-olawuwo/water-potability/main/water_potability.csv"
 
 def load_params(file_path: str) -> float:
     try:
@@ -12,6 +15,24 @@ def load_params(file_path: str) -> float:
     except Exception as e:
         raise Exception(f"Error loading parameters from {file_path}: {e}")
 
+def load_validation_size(file_path: str) -> float:
+    """Fraction of the dataset held out for model selection (0 when absent)."""
+    try:
+        with open(file_path, 'r') as file:
+            params = yaml.safe_load(file)
+        return params['data_collection'].get('validation_size', 0.0)
+    except Exception as e:
+        raise Exception(f"Error loading parameters from {file_path}: {e}")
+
+def load_streaming_params(file_path: str) -> dict:
+    """The ``streaming`` section of params.yaml (disabled when absent)."""
+    try:
+        with open(file_path, 'r') as file:
+            params = yaml.safe_load(file)
+        return {"enabled": False, "chunk_size": 100000, **params.get('streaming', {})}
+    except Exception as e:
+        raise Exception(f"Error loading parameters from {file_path}: {e}")
+
 def load_data(file_path: str) -> pd.DataFrame:
     try:
         return pd.read_csv(file_path)
@@ -24,33 +45,74 @@ def split_data(data: pd.DataFrame, test_size: float) -> tuple[pd.DataFrame, pd.D
     except ValueError as e:
         raise ValueError(f"Error splitting data: {e}")
 
-def save_data(df: pd.DataFrame, file_path: str) -> None:
+def split_validation(train: pd.DataFrame, validation_size: float, test_size: float) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """Carve the validation split (a fraction of the whole dataset) out of ``train``."""
     try:
-        df.to_csv(file_path, index=False)
+        if validation_size <= 0:
+            return train, train.iloc[:0]
+        return train_test_split(train, test_size=validation_size / (1 - test_size), random_state=42)
+    except ValueError as e:
+        raise ValueError(f"Error splitting data: {e}")
+
+def hash_fraction(df: pd.DataFrame) -> np.ndarray:
+    """Deterministic per-row number in [0, 1) from a hash of the row's values.
+
+    A row lands in the same split whatever chunk (or run) it is read in,
+    so no global shuffle is needed; identical rows never straddle splits.
+    """
+    hashes = pd.util.hash_pandas_object(df.astype(np.float64), index=False).to_numpy()
+    return (hashes % np.uint64(1_000_000)).astype(np.float64) / 1_000_000
+
+def split_stream(source: str, test_size: float, validation_size: float, chunk_size: int, raw_data_path: str) -> dict:
+    """Split ``source`` chunk by chunk into partitioned train/validation/test datasets."""
+    try:
+        writers = {name: PartitionWriter(dataset_path(raw_data_path, name)) for name in ('train', 'validation', 'test')}
+        for chunk in iter_batches(source, chunk_size):
+            fraction = hash_fraction(chunk)
+            test_mask = fraction < test_size
+            validation_mask = ~test_mask & (fraction < test_size + validation_size)
+            writers['test'].write(chunk[test_mask])
+            writers['validation'].write(chunk[validation_mask])
+            writers['train'].write(chunk[~test_mask & ~validation_mask])
+        return {name: writer.rows for name, writer in writers.items()}
     except Exception as e:
-        raise Exception(f"Error saving data to {file_path}: {e}")
+        raise Exception(f"Error splitting data stream: {e}")
+
+def save_data(df: pd.DataFrame, file_path: str) -> None:
+    write_table(df, file_path)
 
 def main():
     try:
+        # Load parameters
+        params_file_path = 'params.yaml'
+        test_size = load_params(params_file_path)
+        validation_size = load_validation_size(params_file_path)
+        streaming = load_streaming_params(params_file_path)
+        data_url = os.getenv("DATA_SOURCE", DATA_URL)
+
+        raw_data_path = os.path.join('data', 'raw')
+        os.makedirs(raw_data_path, exist_ok=True)
+
+        if streaming['enabled']:
+            # Out-of-core: one chunk in memory at a time, partitioned outputs
+            print(f"Streaming data from {data_url} in chunks of {streaming['chunk_size']} rows...")
+            rows = split_stream(data_url, test_size, validation_size, streaming['chunk_size'], raw_data_path)
+            print(f"Data collection stage completed successfully! {rows}")
+            return
+
         # Load dataset from URL
-        data_url = "https://raw.githubusercontent.com/abideen-olawuwo/water-potability/main/water_potability.csv"
         # data = load_data(data_path) # Removed local path
         print(f"Downloading data from {data_url}...")
         data = pd.read_csv(data_url)
 
-        # Load parameters
-        params_file_path = 'params.yaml'
-        test_size = load_params(params_file_path)
-
         # Split data
         train_data, test_data = split_data(data, test_size)
+        train_data, validation_data = split_validation(train_data, validation_size, test_size)
 
         # Save outputs
-        raw_data_path = os.path.join('data', 'raw')
-        os.makedirs(raw_data_path, exist_ok=True)
-
-        save_data(train_data, os.path.join(raw_data_path, 'train.csv'))
-        save_data(test_data, os.path.join(raw_data_path, 'test.csv'))
+        save_data(train_data, dataset_path(raw_data_path, 'train'))
+        save_data(validation_data, dataset_path(raw_data_path, 'validation'))
+        save_data(test_data, dataset_path(raw_data_path, 'test'))
 
         print("Data collection stage completed successfully!")
 
@@ -1,51 +1,103 @@
 import numpy as np
 import pandas as pd
 import os
+import yaml
+from imputer import MedianImputer
+from storage import PartitionWriter, dataset_path, iter_batches, read_table, write_table
 
 def load_data(file_path: str) -> pd.DataFrame:
-    """Load dataset from the given CSV file path."""
+    """Load a dataset written by the data collection stage."""
+    return read_table(file_path)
+
+def load_streaming_params(file_path: str) -> dict:
+    """The ``streaming`` section of params.yaml (disabled when absent)."""
     try:
-        return pd.read_csv(file_path)
+        with open(file_path, 'r') as file:
+            params = yaml.safe_load(file)
+        return {"enabled": False, "chunk_size": 100000, "relative_accuracy": 0.001, **params.get('streaming', {})}
     except Exception as e:
-        raise Exception(f"Error loading data from {file_path}: {e}")
+        raise Exception(f"Error loading parameters from {file_path}: {e}")
 
-def handle_missing_values(df: pd.DataFrame) -> pd.DataFrame:
-    """Fill missing values with the median of each column."""
+def fit_imputer(df: pd.DataFrame) -> MedianImputer:
+    """Learn the per-column medians of the training data."""
     try:
-        for column in df.columns:
-            if df[column].isnull().any():
-                missing_value = df[column].median()
-                df[column] = df[column].fillna(missing_value)
-        return df
+        return MedianImputer().fit(df)
+    except Exception as e:
+        raise Exception(f"Error fitting imputer: {e}")
+
+def handle_missing_values(df: pd.DataFrame, imputer: MedianImputer) -> pd.DataFrame:
+    """Fill missing values in place with the fitted training medians."""
+    try:
+        return imputer.transform(df)
     except Exception as e:
         raise Exception(f"Error filling missing values: {e}")
 
-def save_data(df: pd.DataFrame, file_path: str) -> None:
-    """Save processed DataFrame to a CSV file."""
+def fit_imputer_streaming(file_path: str, chunk_size: int, relative_accuracy: float) -> MedianImputer:
+    """Approximate training medians from mergeable sketches, one chunk at a time."""
     try:
-        df.to_csv(file_path, index=False)
+        imputer = MedianImputer()
+        for chunk in iter_batches(file_path, chunk_size):
+            imputer.partial_fit(chunk, relative_accuracy=relative_accuracy)
+        return imputer.finalize()
     except Exception as e:
-        raise Exception(f"Error saving data to {file_path}: {e}")
+        raise Exception(f"Error fitting imputer: {e}")
+
+def preprocess_streaming(src_path: str, dst_path: str, imputer: MedianImputer, chunk_size: int) -> int:
+    """Impute ``src_path`` chunk by chunk into a partitioned ``dst_path``."""
+    writer = PartitionWriter(dst_path)
+    for chunk in iter_batches(src_path, chunk_size):
+        writer.write(handle_missing_values(chunk, imputer))
+    return writer.rows
+
+def save_data(df: pd.DataFrame, file_path: str) -> None:
+    """Save processed DataFrame as a columnar file."""
+    write_table(df, file_path)
 
 def main():
     try:
         raw_data_path = "./data/raw/"
         processed_data_path = "./data/preprocessing"  # ✅ fixed to match dvc.yaml
+        imputer_path = os.path.join("models", "imputer.json")
+        streaming = load_streaming_params("params.yaml")
+
+        if streaming["enabled"]:
+            # Out-of-core: two passes over the training partitions (sketch, then
+            # impute) and one over the other splits, a chunk at a time
+            chunk_size = streaming["chunk_size"]
+            imputer = fit_imputer_streaming(dataset_path(raw_data_path, "train"), chunk_size, streaming["relative_accuracy"])
+            imputer.save(imputer_path)
+            for name in ("train", "validation", "test"):
+                rows = preprocess_streaming(
+                    dataset_path(raw_data_path, name),
+                    dataset_path(processed_data_path, f"{name}_processed"),
+                    imputer,
+                    chunk_size,
+                )
+                print(f"Preprocessed {rows} {name} rows")
+            print("Data preprocessing completed successfully!")
+            return
 
         # Load raw data
-        train_data = load_data(os.path.join(raw_data_path, "train.csv"))
-        test_data = load_data(os.path.join(raw_data_path, "test.csv"))
+        train_data = load_data(dataset_path(raw_data_path, "train"))
+        validation_data = load_data(dataset_path(raw_data_path, "validation"))
+        test_data = load_data(dataset_path(raw_data_path, "test"))
+
+        # Handle missing values with medians learned on the training split only
+        imputer = fit_imputer(train_data)
+        train_processed_data = handle_missing_values(train_data, imputer)
+        validation_processed_data = handle_missing_values(validation_data, imputer)
+        test_processed_data = handle_missing_values(test_data, imputer)
 
-        # Handle missing values
-        train_processed_data = handle_missing_values(train_data)
-        test_processed_data = handle_missing_values(test_data)
+        # Persist the medians for evaluation-time and serving-time imputation
+        imputer.save(imputer_path)
 
         # Create output directory (if it doesn't exist)
         os.makedirs(processed_data_path, exist_ok=True)
 
         # Save processed data
-        save_data(train_processed_data, os.path.join(processed_data_path, "train_processed.csv"))
-        save_data(test_processed_data, os.path.join(processed_data_path, "test_processed.csv"))
+        save_data(train_processed_data, dataset_path(processed_data_path, "train_processed"))
+        save_data(validation_processed_data, dataset_path(processed_data_path, "validation_processed"))
+        save_data(test_processed_data, dataset_path(processed_data_path, "test_processed"))
 
         print("Data preprocessing completed successfully!")
 
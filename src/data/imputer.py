@@ -0,0 +1,204 @@
+"""Median imputation fitted once on the training data.
+
+``MedianImputer.fit`` computes every column median in one vectorized pass;
+``partial_fit`` instead feeds chunks into mergeable ``QuantileSketch``es for
+data that does not fit in memory. The fitted medians are saved as JSON next
+to the model so the test set and the serving API fill gaps with exactly the
+training statistics.
+"""
+import json
+import math
+import os
+from collections import Counter
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+TARGET = "Potability"
+
+
+class QuantileSketch:
+    """Mergeable quantile sketch with bounded relative error (DDSketch).
+
+    Values are counted in logarithmic buckets of width ``gamma``, so any
+    quantile is returned within ``relative_accuracy`` of a true value while
+    memory grows only with the log of the value range. Sketches built on
+    separate chunks or partitions combine exactly with ``merge``.
+    """
+
+    min_value = 1e-9
+
+    def __init__(self, relative_accuracy: float = 0.001):
+        if not 0 < relative_accuracy < 1:
+            raise ValueError("relative_accuracy must be between 0 and 1.")
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.positive: Counter = Counter()
+        self.negative: Counter = Counter()
+        self.zeros = 0
+        self.count = 0
+
+    def _bucket(self, store: Counter, values: np.ndarray) -> None:
+        if len(values):
+            keys = np.ceil(np.log(values) / self._log_gamma).astype(np.int64)
+            keys, counts = np.unique(keys, return_counts=True)
+            store.update(dict(zip(keys.tolist(), counts.tolist())))
+
+    def update(self, values) -> None:
+        """Add an array of values (NaN and infinities are skipped)."""
+        values = np.asarray(values, dtype=np.float64).ravel()
+        values = values[np.isfinite(values)]
+        self.count += len(values)
+        self._bucket(self.positive, values[values >= self.min_value])
+        self._bucket(self.negative, -values[values <= -self.min_value])
+        self.zeros += int(np.count_nonzero(np.abs(values) < self.min_value))
+
+    def merge(self, other: "QuantileSketch") -> None:
+        if other.relative_accuracy != self.relative_accuracy:
+            raise ValueError("Cannot merge sketches with different accuracies.")
+        self.positive.update(other.positive)
+        self.negative.update(other.negative)
+        self.zeros += other.zeros
+        self.count += other.count
+
+    def quantile(self, q: float) -> float:
+        if self.count == 0:
+            return float("nan")
+        rank = q * (self.count - 1)
+        seen = 0
+        for key in sorted(self.negative, reverse=True):
+            seen += self.negative[key]
+            if seen > rank:
+                return -2 * self.gamma ** key / (self.gamma + 1)
+        seen += self.zeros
+        if seen > rank:
+            return 0.0
+        for key in sorted(self.positive):
+            seen += self.positive[key]
+            if seen > rank:
+                return 2 * self.gamma ** key / (self.gamma + 1)
+        return 2 * self.gamma ** max(self.positive) / (self.gamma + 1)
+
+    def to_dict(self) -> dict:
+        return {
+            "relative_accuracy": self.relative_accuracy,
+            "count": self.count,
+            "zeros": self.zeros,
+            "positive": {str(k): v for k, v in self.positive.items()},
+            "negative": {str(k): v for k, v in self.negative.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "QuantileSketch":
+        sketch = cls(data["relative_accuracy"])
+        sketch.count = data["count"]
+        sketch.zeros = data["zeros"]
+        sketch.positive = Counter({int(k): v for k, v in data["positive"].items()})
+        sketch.negative = Counter({int(k): v for k, v in data["negative"].items()})
+        return sketch
+
+
+class MedianImputer:
+    """Fill missing values with per-column medians learned on training data."""
+
+    def __init__(self, statistics: Optional[Dict[str, float]] = None, method: str = "exact", n_samples: int = 0):
+        self.statistics = dict(statistics or {})
+        self.method = method
+        self.n_samples = n_samples
+        self.sketches: Dict[str, QuantileSketch] = {}
+
+    @property
+    def columns(self) -> List[str]:
+        return list(self.statistics)
+
+    @staticmethod
+    def _columns(df: pd.DataFrame, columns: Optional[Sequence[str]]) -> List[str]:
+        if columns is not None:
+            return list(columns)
+        return [c for c in df.select_dtypes(include=[np.number]).columns if c != TARGET]
+
+    # ----------------------------------------------------------
+    # Fitting
+    # ----------------------------------------------------------
+    def fit(self, df: pd.DataFrame, columns: Optional[Sequence[str]] = None) -> "MedianImputer":
+        """Exact medians of ``columns`` (default: numeric, non-target) in one pass."""
+        columns = self._columns(df, columns)
+        medians = np.nanmedian(df[columns].to_numpy(dtype=np.float64), axis=0)
+        self.statistics = dict(zip(columns, medians.tolist()))
+        self.method = "exact"
+        self.n_samples = len(df)
+        return self
+
+    def partial_fit(
+        self, df: pd.DataFrame, columns: Optional[Sequence[str]] = None, relative_accuracy: float = 0.001
+    ) -> "MedianImputer":
+        """Add one chunk to the streaming sketches; call ``finalize`` afterwards."""
+        columns = self._columns(df, columns)
+        values = df[columns].to_numpy(dtype=np.float64)
+        for index, column in enumerate(columns):
+            sketch = self.sketches.get(column)
+            if sketch is None:
+                sketch = self.sketches[column] = QuantileSketch(relative_accuracy)
+            sketch.update(values[:, index])
+        self.n_samples += len(df)
+        return self
+
+    def merge(self, other: "MedianImputer") -> "MedianImputer":
+        """Combine the sketches of an imputer fitted on another partition."""
+        for column, sketch in other.sketches.items():
+            if column in self.sketches:
+                self.sketches[column].merge(sketch)
+            else:
+                self.sketches[column] = QuantileSketch.from_dict(sketch.to_dict())
+        self.n_samples += other.n_samples
+        return self
+
+    def finalize(self) -> "MedianImputer":
+        """Turn the streaming sketches into approximate medians."""
+        self.statistics = {column: sketch.quantile(0.5) for column, sketch in self.sketches.items()}
+        self.method = "sketch"
+        return self
+
+    # ----------------------------------------------------------
+    # Applying
+    # ----------------------------------------------------------
+    def transform(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Fill missing values of ``df`` in place and return it."""
+        if not self.statistics:
+            raise ValueError("Imputer has not been fitted.")
+        df.fillna(value={c: v for c, v in self.statistics.items() if c in df.columns}, inplace=True)
+        return df
+
+    def transform_array(self, X: np.ndarray, columns: Sequence[str]) -> np.ndarray:
+        """Fill NaNs of a float matrix whose columns are ``columns``, in place."""
+        missing = np.isnan(X)
+        if missing.any():
+            fill = np.array([self.statistics[column] for column in columns], dtype=X.dtype)
+            rows, cols = np.nonzero(missing)
+            X[rows, cols] = fill[cols]
+        return X
+
+    # ----------------------------------------------------------
+    # Persistence
+    # ----------------------------------------------------------
+    def to_dict(self) -> dict:
+        return {"method": self.method, "n_samples": self.n_samples, "statistics": self.statistics}
+
+    def save(self, path: str) -> None:
+        try:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            with open(path, "w") as f:
+                json.dump(self.to_dict(), f, indent=4)
+        except Exception as e:
+            raise Exception(f"Error saving imputer to {path}: {e}")
+
+    @classmethod
+    def load(cls, path: str) -> "MedianImputer":
+        try:
+            with open(path) as f:
+                data = json.load(f)
+            return cls(data["statistics"], method=data.get("method", "exact"), n_samples=data.get("n_samples", 0))
+        except Exception as e:
+            raise Exception(f"Error loading imputer from {path}: {e}")
@@ -0,0 +1,163 @@
+"""Columnar storage shared by the pipeline stages.
+
+Stage outputs are written as Parquet (``.parquet``) or Arrow IPC
+(``.arrow``) files instead of CSV. Numeric feature columns are stored
+as float32 -- the precision the tree models split on -- and the target as a
+small integer, so files are about half the size and are read without any
+text parsing.
+
+``read_table`` reads only the requested columns and memory-maps the file;
+Arrow IPC files are mapped zero-copy. Legacy ``.csv`` paths are still read
+(and written) so older DVC caches keep working.
+
+Streaming stages write the same path as a directory of ``part-NNNNN.parquet``
+files instead (``PartitionWriter``); every reader accepts either layout.
+"""
+import glob
+import hashlib
+import os
+import shutil
+from typing import Iterator, List, Optional
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.ipc as ipc
+import pyarrow.parquet as pq
+
+TARGET = "Potability"
+SUFFIX = ".parquet"
+
+
+def dataset_path(directory: str, name: str, suffix: str = SUFFIX) -> str:
+    """Path of dataset ``name`` in ``directory`` (e.g. ``data/raw/train.parquet``)."""
+    return os.path.join(directory, name + suffix)
+
+
+def to_table(df: pd.DataFrame, float32: bool = True) -> pa.Table:
+    """Convert a frame to an Arrow table with compact column types."""
+    fields = []
+    for column in df.columns:
+        dtype = df[column].dtype
+        if column == TARGET and not df[column].isnull().any():
+            arrow_type = pa.int8()
+        elif float32 and np.issubdtype(dtype, np.number):
+            arrow_type = pa.float32()
+        else:
+            arrow_type = pa.from_numpy_dtype(dtype) if dtype != object else pa.string()
+        fields.append(pa.field(str(column), arrow_type))
+    return pa.Table.from_pandas(df, schema=pa.schema(fields), preserve_index=False)
+
+
+def remove_dataset(path: str) -> None:
+    """Delete a dataset written as a single file or as a partition directory."""
+    if os.path.isdir(path):
+        shutil.rmtree(path)
+    elif os.path.exists(path):
+        os.remove(path)
+
+
+def partition_files(path: str) -> List[str]:
+    """Part files of a partitioned dataset, in write order."""
+    return sorted(glob.glob(os.path.join(path, "part-*.parquet")))
+
+
+def write_table(df: pd.DataFrame, path: str, float32: bool = True) -> None:
+    """Write ``df`` to ``path``; the format follows the file extension."""
+    try:
+        remove_dataset(path)
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        if path.endswith(".csv"):
+            df.to_csv(path, index=False)
+            return
+
+        table = to_table(df, float32=float32)
+        if path.endswith(".arrow"):
+            with ipc.new_file(path, table.schema) as writer:
+                writer.write_table(table)
+        else:
+            pq.write_table(table, path)
+    except Exception as e:
+        raise Exception(f"Error saving data to {path}: {e}")
+
+
+class PartitionWriter:
+    """Write a dataset chunk by chunk as ``path/part-NNNNN.parquet`` files.
+
+    Only the current chunk is held in memory. Every part is cast to the
+    schema of the first one, so chunks whose inferred dtypes differ (e.g. a
+    column without decimals in one chunk) still form a single dataset.
+    """
+
+    def __init__(self, path: str, float32: bool = True):
+        self.path = path
+        self.float32 = float32
+        self.schema: Optional[pa.Schema] = None
+        self.parts = 0
+        self.rows = 0
+        remove_dataset(path)
+        os.makedirs(path)
+
+    def write(self, df: pd.DataFrame) -> None:
+        if len(df) == 0:
+            return
+        try:
+            table = to_table(df, float32=self.float32)
+            if self.schema is None:
+                self.schema = table.schema
+            pq.write_table(table.cast(self.schema), os.path.join(self.path, f"part-{self.parts:05d}.parquet"))
+            self.parts += 1
+            self.rows += len(df)
+        except Exception as e:
+            raise Exception(f"Error saving data to {self.path}: {e}")
+
+
+def read_arrow(path: str, columns: Optional[List[str]] = None, memory_map: bool = True) -> pa.Table:
+    """Read a Parquet or Arrow IPC file (or partition directory) as an Arrow table."""
+    if path.endswith(".arrow"):
+        source = pa.memory_map(path) if memory_map else pa.OSFile(path)
+        table = ipc.open_file(source).read_all()
+        return table.select(columns) if columns is not None else table
+    return pq.read_table(path, columns=columns, memory_map=memory_map)
+
+
+def read_table(path: str, columns: Optional[List[str]] = None, memory_map: bool = True) -> pd.DataFrame:
+    """Load ``columns`` (default all) of a stage output into a DataFrame."""
+    try:
+        if path.endswith(".csv"):
+            return pd.read_csv(path, usecols=columns)
+        return read_arrow(path, columns=columns, memory_map=memory_map).to_pandas()
+    except Exception as e:
+        raise Exception(f"Error loading data from {path}: {e}")
+
+
+def iter_batches(path: str, batch_size: int, columns: Optional[List[str]] = None) -> Iterator[pd.DataFrame]:
+    """Yield DataFrames of at most ``batch_size`` rows without loading the whole file."""
+    try:
+        if os.path.isdir(path):
+            for part in partition_files(path):
+                for batch in pq.ParquetFile(part).iter_batches(batch_size=batch_size, columns=columns):
+                    yield batch.to_pandas()
+        elif path.endswith(".csv"):
+            yield from pd.read_csv(path, usecols=columns, chunksize=batch_size)
+        elif path.endswith(".arrow"):
+            for batch in read_arrow(path, columns=columns).to_batches(max_chunksize=batch_size):
+                yield batch.to_pandas()
+        else:
+            for batch in pq.ParquetFile(path).iter_batches(batch_size=batch_size, columns=columns):
+                yield batch.to_pandas()
+    except Exception as e:
+        raise Exception(f"Error reading {path}: {e}")
+
+
+def data_hash(df: pd.DataFrame) -> str:
+    """Content hash of a dataset (values, column names and order)."""
+    digest = hashlib.sha1(",".join(map(str, df.columns)).encode())
+    digest.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    return digest.hexdigest()[:16]
+
+
+def load_xy(path: str, target: str = TARGET):
+    """Features and target of a labelled stage output, as (X, y)."""
+    df = read_table(path)
+    return df.drop(columns=[target]), df[target]
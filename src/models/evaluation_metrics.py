@@ -0,0 +1,193 @@
+"""Probability-based evaluation from a single sorted pass over the scores.
+
+The test scores are sorted once (descending). Cumulative sums of the
+positive and negative labels in that order give the confusion counts at
+every distinct threshold, from which the whole threshold sweep, the ROC and
+precision-recall curves, ROC AUC and average precision follow without any
+per-threshold loop.
+
+Bootstrap replicates reuse the same order: a resample is a vector of row
+counts, so its curves are the weighted cumulative sums of the same sorted
+labels, computed for a block of replicates at once.
+"""
+from typing import Optional
+
+import numpy as np
+
+# Upper bound on replicate x row cells held in memory per bootstrap block
+BOOTSTRAP_BLOCK_CELLS = 20_000_000
+
+
+class SortedScores:
+    """Labels and scores sorted by descending score, with distinct-threshold ends."""
+
+    def __init__(self, y_true: np.ndarray, scores: np.ndarray, predictions: Optional[np.ndarray] = None):
+        order = np.argsort(-np.asarray(scores, dtype=np.float64), kind="mergesort")
+        self.scores = np.asarray(scores, dtype=np.float64)[order]
+        self.y = np.asarray(y_true, dtype=np.float64)[order]
+        self.predictions = None if predictions is None else np.asarray(predictions, dtype=np.float64)[order]
+        # Last index of each run of tied scores: a threshold keeps every row
+        # whose score is >= it, so ties enter the positive side together
+        self.ends = np.r_[np.flatnonzero(np.diff(self.scores)), len(self.scores) - 1]
+        self.thresholds = self.scores[self.ends]
+
+    def __len__(self) -> int:
+        return len(self.scores)
+
+    def counts(self, weights: Optional[np.ndarray] = None):
+        """True / false positives at every threshold (per replicate if ``weights`` is 2-D)."""
+        positives = self.y if weights is None else weights * self.y
+        negatives = (1 - self.y) if weights is None else weights - positives
+        tps = np.cumsum(positives, axis=-1)[..., self.ends]
+        fps = np.cumsum(negatives, axis=-1)[..., self.ends]
+        return tps, fps
+
+
+# ==============================================================
+# Curves
+# ==============================================================
+def safe_divide(numerator, denominator):
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(denominator > 0, numerator / np.where(denominator > 0, denominator, 1), 0.0)
+
+
+def curve_metrics(tps: np.ndarray, fps: np.ndarray) -> dict:
+    """ROC AUC and average precision from cumulative counts (last axis = thresholds)."""
+    n_pos, n_neg = tps[..., -1:], fps[..., -1:]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        tpr = tps / n_pos
+        fpr = fps / n_neg
+    zeros = np.zeros(tps.shape[:-1] + (1,))
+    tpr, fpr = np.concatenate([zeros, tpr], axis=-1), np.concatenate([zeros, fpr], axis=-1)
+    roc_auc = np.sum(np.diff(fpr, axis=-1) * (tpr[..., 1:] + tpr[..., :-1]) / 2, axis=-1)
+
+    # Average precision: precision weighted by each step in recall (as sklearn)
+    precision = safe_divide(tps, tps + fps)
+    average_precision = np.sum(np.diff(tpr, axis=-1) * precision, axis=-1)
+    return {"roc_auc": roc_auc, "average_precision": average_precision}
+
+
+def threshold_sweep(sorted_scores: SortedScores) -> dict:
+    """Confusion counts and rates at every distinct threshold.
+
+    Rows are predicted positive strictly above the threshold, as served
+    (``forest_format.threshold_predictions``): at each distinct score, the
+    positives are the rows of the higher-scoring runs only.
+    """
+    tps, fps = (counts.astype(np.int64) for counts in sorted_scores.counts())
+    n_pos, n_neg = tps[-1], fps[-1]
+    tps, fps = np.r_[0, tps[:-1]], np.r_[0, fps[:-1]]
+    fns, tns = n_pos - tps, n_neg - fps
+    precision = safe_divide(tps, tps + fps)
+    recall = safe_divide(tps, np.full(tps.shape, n_pos))
+    return {
+        "threshold": sorted_scores.thresholds,
+        "tp": tps, "fp": fps, "fn": fns, "tn": tns,
+        "precision": precision,
+        "recall": recall,
+        "f1": safe_divide(2 * precision * recall, precision + recall),
+        "fpr": safe_divide(fps, np.full(fps.shape, n_neg)),
+        "tpr": recall,
+        "accuracy": (tps + tns) / len(sorted_scores),
+    }
+
+
+def operating_points(sweep: dict) -> dict:
+    """Thresholds that maximize F1 and Youden's J (tpr - fpr)."""
+    points = {}
+    for name, objective in (("max_f1", sweep["f1"]), ("max_youden_j", sweep["tpr"] - sweep["fpr"])):
+        best = int(np.argmax(objective))
+        points[name] = {
+            key: float(sweep[key][best]) for key in ("threshold", "precision", "recall", "f1", "fpr", "accuracy")
+        }
+    return points
+
+
+# ==============================================================
+# Calibration
+# ==============================================================
+def calibration(y_true: np.ndarray, scores: np.ndarray, n_bins: int = 10) -> dict:
+    """Reliability bins, expected calibration error, Brier score and log loss."""
+    y_true = np.asarray(y_true, dtype=np.float64)
+    scores = np.asarray(scores, dtype=np.float64)
+    bins = np.minimum((scores * n_bins).astype(np.intp), n_bins - 1)
+    counts = np.bincount(bins, minlength=n_bins)
+    predicted = np.bincount(bins, weights=scores, minlength=n_bins)
+    observed = np.bincount(bins, weights=y_true, minlength=n_bins)
+    mean_predicted = safe_divide(predicted, counts)
+    fraction_positive = safe_divide(observed, counts)
+
+    clipped = np.clip(scores, 1e-15, 1 - 1e-15)
+    return {
+        "bins": [
+            {
+                "lower": i / n_bins,
+                "upper": (i + 1) / n_bins,
+                "count": int(counts[i]),
+                "mean_predicted": float(mean_predicted[i]),
+                "fraction_positive": float(fraction_positive[i]),
+            }
+            for i in range(n_bins)
+        ],
+        "expected_calibration_error": float(np.sum(counts / len(scores) * np.abs(fraction_positive - mean_predicted))),
+        "brier_score": float(np.mean((scores - y_true) ** 2)),
+        "log_loss": float(-np.mean(y_true * np.log(clipped) + (1 - y_true) * np.log(1 - clipped))),
+    }
+
+
+# ==============================================================
+# Bootstrap
+# ==============================================================
+def label_metrics(tp, fp, fn, tn) -> dict:
+    precision = safe_divide(tp, tp + fp)
+    recall = safe_divide(tp, tp + fn)
+    return {
+        "accuracy": safe_divide(tp + tn, tp + fp + fn + tn),
+        "precision": precision,
+        "recall": recall,
+        "f1": safe_divide(2 * precision * recall, precision + recall),
+    }
+
+
+def bootstrap(sorted_scores: SortedScores, n_samples: int = 1000, confidence: float = 0.95,
+              random_state: int = 42) -> dict:
+    """Percentile confidence intervals of the test metrics over row resamples."""
+    rng = np.random.default_rng(random_state)
+    n = len(sorted_scores)
+    y, predictions = sorted_scores.y, sorted_scores.predictions
+    block = max(1, BOOTSTRAP_BLOCK_CELLS // max(n, 1))
+    replicates = {}
+
+    for start in range(0, n_samples, block):
+        size = min(block, n_samples - start)
+        # Row counts of each resample, in sorted order
+        draws = rng.integers(0, n, size=(size, n)) + n * np.arange(size)[:, None]
+        weights = np.bincount(draws.ravel(), minlength=size * n).reshape(size, n).astype(np.float64)
+
+        tps, fps = sorted_scores.counts(weights)
+        values = curve_metrics(tps, fps)
+        values["brier_score"] = weights @ (sorted_scores.scores - y) ** 2 / n
+        if predictions is not None:
+            tp = weights @ (y * predictions)
+            fp = weights @ ((1 - y) * predictions)
+            fn = weights @ (y * (1 - predictions))
+            tn = weights @ ((1 - y) * (1 - predictions))
+            values.update(label_metrics(tp, fp, fn, tn))
+
+        # A resample with a single class has no ROC curve
+        degenerate = (tps[:, -1] == 0) | (fps[:, -1] == 0)
+        values["roc_auc"] = np.where(degenerate, np.nan, values["roc_auc"])
+        values["average_precision"] = np.where(tps[:, -1] == 0, np.nan, values["average_precision"])
+        for name, value in values.items():
+            replicates.setdefault(name, []).append(value)
+
+    alpha = (1 - confidence) / 2
+    intervals = {}
+    for name, chunks in replicates.items():
+        values = np.concatenate(chunks)
+        intervals[name] = {
+            "lower": float(np.nanquantile(values, alpha)),
+            "upper": float(np.nanquantile(values, 1 - alpha)),
+            "std": float(np.nanstd(values)),
+        }
+    return {"n_samples": n_samples, "confidence": confidence, "intervals": intervals}
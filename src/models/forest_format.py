@@ -0,0 +1,367 @@
+"""Flat, memory-mappable storage for trained random forests.
+
+A forest is written as a directory of ``.npy`` arrays plus ``meta.json``:
+
+    meta.json           classes, feature names, tree count, max depth and
+                        (optionally) the serving decision threshold
+    roots.npy           (n_trees,)     int32   index of each tree's root node
+    feature.npy         (n_nodes,)     int32   split feature (0 for leaves)
+    threshold.npy       (n_nodes,)     float64 split threshold (+inf for leaves)
+    children_left.npy   (n_nodes,)     int32   global index of the left child
+    children_right.npy  (n_nodes,)     int32   global index of the right child
+    value.npy           (n_nodes, n_classes) float64 normalized class probabilities
+
+Nodes of all trees are concatenated, and child indices are global. Leaves
+point to themselves on both sides (with an infinite threshold), so walking
+one step further from a leaf is a no-op.
+
+Loading maps the arrays read-only with ``np.load(mmap_mode="r")``: start-up
+does not unpickle anything, and every process serving the same artifact
+shares one copy in the OS page cache.
+"""
+import json
+import os
+import pickle
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.tree import DecisionTreeClassifier
+from sklearn.tree._tree import NODE_DTYPE, TREE_LEAF, TREE_UNDEFINED, Tree
+
+FORMAT_VERSION = 1
+ARRAYS = ("roots", "feature", "threshold", "children_left", "children_right", "value")
+DEFAULT_DECISION_THRESHOLD = 0.5
+# Batch size above which sklearn's traversal beats the vectorized walk
+DEFAULT_VECTORIZED_MAX_ROWS = 100
+
+
+# ==============================================================
+# Export
+# ==============================================================
+def flatten_forest(clf) -> dict:
+    """Concatenate the node arrays of every tree in a fitted sklearn forest."""
+    n_classes = len(clf.classes_)
+    roots, feature, threshold, left, right, value = [], [], [], [], [], []
+    offset = 0
+
+    for estimator in clf.estimators_:
+        tree = estimator.tree_
+        n_nodes = tree.node_count
+        local = np.arange(n_nodes)
+        is_leaf = tree.children_left == -1
+
+        roots.append(offset)
+        feature.append(np.where(is_leaf, 0, tree.feature))
+        threshold.append(np.where(is_leaf, np.inf, tree.threshold))
+        left.append(np.where(is_leaf, local, tree.children_left) + offset)
+        right.append(np.where(is_leaf, local, tree.children_right) + offset)
+
+        # Same normalization DecisionTreeClassifier.predict_proba applies
+        proba = tree.value[:, 0, :n_classes].astype(np.float64)
+        normalizer = proba.sum(axis=1)[:, np.newaxis]
+        normalizer[normalizer == 0.0] = 1.0
+        value.append(proba / normalizer)
+
+        offset += n_nodes
+
+    return {
+        "roots": np.asarray(roots, dtype=np.int32),
+        "feature": np.concatenate(feature).astype(np.int32),
+        "threshold": np.concatenate(threshold).astype(np.float64),
+        "children_left": np.concatenate(left).astype(np.int32),
+        "children_right": np.concatenate(right).astype(np.int32),
+        "value": np.ascontiguousarray(np.concatenate(value)),
+    }
+
+
+def forest_meta(clf, arrays: dict) -> dict:
+    """Metadata stored alongside the flat arrays."""
+    feature_names = getattr(clf, "feature_names_in_", None)
+    return {
+        "format_version": FORMAT_VERSION,
+        "model_type": type(clf).__name__,
+        "n_trees": len(clf.estimators_),
+        "n_nodes": int(arrays["feature"].shape[0]),
+        "n_features": int(clf.n_features_in_),
+        "max_depth": int(max(e.tree_.max_depth for e in clf.estimators_)),
+        "classes": np.asarray(clf.classes_).tolist(),
+        "feature_names": list(feature_names) if feature_names is not None else None,
+    }
+
+
+def export_forest(clf, out_dir: str, decision_threshold: Optional[float] = None) -> str:
+    """Write a fitted RandomForestClassifier in the flat array format.
+
+    ``decision_threshold`` (probability of class 1 above which class 1 is
+    predicted, see ``threshold_predictions``) is recorded in ``meta.json``
+    when given.
+    """
+    try:
+        os.makedirs(out_dir, exist_ok=True)
+        arrays = flatten_forest(clf)
+        for name in ARRAYS:
+            np.save(os.path.join(out_dir, f"{name}.npy"), arrays[name])
+
+        meta = forest_meta(clf, arrays)
+        if decision_threshold is not None:
+            meta["decision_threshold"] = float(decision_threshold)
+        with open(os.path.join(out_dir, "meta.json"), "w") as f:
+            json.dump(meta, f, indent=4)
+        return out_dir
+    except Exception as e:
+        raise Exception(f"Error exporting forest to {out_dir}: {e}")
+
+
+# ==============================================================
+# Loading / Inference
+# ==============================================================
+class FlatForest:
+    """Vectorized inference over a flattened forest (sklearn-style API).
+
+    All trees are evaluated together: the current node of every
+    (tree, sample) pair is held in one ``(n_trees, n_samples)`` index array
+    and advanced one level per step with array gathers, for ``max_depth``
+    steps. There is no per-tree Python loop, no joblib dispatch and no
+    sklearn input validation, which dominate the cost of small batches.
+
+    Results are bit-for-bit identical to ``RandomForestClassifier.predict_proba``:
+    inputs are cast to float32 like sklearn trees, splits use the same
+    ``x <= threshold`` test, leaf probabilities are normalized the same way
+    and summed over trees in estimator order before dividing by the count.
+
+    Every (tree, sample) pair walks all ``max_depth`` levels, so the cost
+    grows with ``n_samples * max_depth`` even for paths that end early;
+    sklearn's compiled per-sample traversal wins on large batches. Batches
+    of more than ``vectorized_max_rows`` rows are therefore scored by an
+    sklearn forest rebuilt from the same arrays (``to_estimator``), which
+    gives the same probabilities.
+    """
+
+    # Upper bound on (n_trees * n_samples) node indices held at once
+    max_block = 2_000_000
+    # Largest batch scored by the vectorized walk; None disables the sklearn path
+    vectorized_max_rows: Optional[int] = DEFAULT_VECTORIZED_MAX_ROWS
+
+    def __init__(self, arrays: dict, meta: dict):
+        self.meta = meta
+        self.roots = arrays["roots"]
+        self.feature = arrays["feature"]
+        self.threshold = arrays["threshold"]
+        self.children_left = arrays["children_left"]
+        self.children_right = arrays["children_right"]
+        self.value = arrays["value"]
+
+        self.classes_ = np.asarray(meta["classes"])
+        self.n_features_in_ = meta["n_features"]
+        self.n_estimators = meta["n_trees"]
+        self.max_depth = meta["max_depth"]
+        if meta.get("feature_names") is not None:
+            self.feature_names_in_ = np.asarray(meta["feature_names"], dtype=object)
+        self._estimator = None
+
+    @classmethod
+    def from_estimator(cls, clf) -> "FlatForest":
+        """Flatten a fitted sklearn forest in memory (no export step)."""
+        arrays = flatten_forest(clf)
+        return cls(arrays, forest_meta(clf, arrays))
+
+    def _validate(self, X) -> np.ndarray:
+        """Order columns like training and cast to float32 as sklearn trees do."""
+        if isinstance(X, pd.DataFrame) and hasattr(self, "feature_names_in_"):
+            X = X[list(self.feature_names_in_)]
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim != 2 or X.shape[1] != self.n_features_in_:
+            raise ValueError(
+                f"Expected input of shape (n_samples, {self.n_features_in_}), got {X.shape}."
+            )
+        if not np.isfinite(X).all():
+            raise ValueError("Input contains NaN or infinity.")
+        return X
+
+    def to_estimator(self) -> RandomForestClassifier:
+        """sklearn forest over the same nodes (built once, on first use)."""
+        if self._estimator is None:
+            self._estimator = rebuild_estimator(self)
+        return self._estimator
+
+    def predict_proba(self, X) -> np.ndarray:
+        X = self._validate(X)
+        n_samples = X.shape[0]
+        if self.vectorized_max_rows is not None and n_samples > self.vectorized_max_rows:
+            return self.to_estimator().predict_proba(X)
+        proba = np.empty((n_samples, len(self.classes_)), dtype=np.float64)
+
+        chunk = max(1, self.max_block // max(1, len(self.roots)))
+        for start in range(0, n_samples, chunk):
+            stop = min(start + chunk, n_samples)
+            proba[start:stop] = self._predict_block(X[start:stop])
+        return proba
+
+    def _predict_block(self, X: np.ndarray) -> np.ndarray:
+        n_samples, n_features = X.shape
+        flat_X = X.ravel()
+        # Offset of each sample's row in flat_X, broadcast against the trees
+        row_offset = (np.arange(n_samples, dtype=np.intp) * n_features)[np.newaxis, :]
+
+        node = np.repeat(self.roots.astype(np.intp)[:, np.newaxis], n_samples, axis=1)
+        for _ in range(self.max_depth):
+            go_left = flat_X[row_offset + self.feature[node]] <= self.threshold[node]
+            node = np.where(go_left, self.children_left[node], self.children_right[node])
+
+        # cumsum accumulates strictly in tree order, matching sklearn's
+        # sequential `out += tree_proba`; a plain sum may reorder additions
+        leaf_values = self.value[node]  # (n_trees, n_samples, n_classes)
+        total = np.cumsum(leaf_values, axis=0)[-1]
+        return total / len(self.roots)
+
+    def predict(self, X) -> np.ndarray:
+        return self.classes_[np.argmax(self.predict_proba(X), axis=1)]
+
+
+def rebuild_estimator(forest: FlatForest) -> RandomForestClassifier:
+    """RandomForestClassifier whose trees are rebuilt from the flat node arrays.
+
+    Leaf values are stored normalized, which sklearn's own normalization in
+    ``predict_proba`` leaves unchanged, so the probabilities match the
+    vectorized walk. The forest is fitted without feature names and takes
+    bare arrays in training column order.
+    """
+    n_classes = len(forest.classes_)
+    ends = np.r_[forest.roots[1:], len(forest.feature)]
+    estimators = []
+    for start, stop in zip(forest.roots.astype(np.intp), ends.astype(np.intp)):
+        local = np.arange(stop - start)
+        left = forest.children_left[start:stop] - start
+        is_leaf = left == local
+
+        nodes = np.zeros(len(local), dtype=NODE_DTYPE)
+        nodes["left_child"] = np.where(is_leaf, TREE_LEAF, left)
+        nodes["right_child"] = np.where(is_leaf, TREE_LEAF, forest.children_right[start:stop] - start)
+        nodes["feature"] = np.where(is_leaf, TREE_UNDEFINED, forest.feature[start:stop])
+        nodes["threshold"] = np.where(is_leaf, TREE_UNDEFINED, forest.threshold[start:stop])
+        nodes["n_node_samples"] = 1
+        nodes["weighted_n_node_samples"] = 1.0
+
+        tree = Tree(forest.n_features_in_, np.array([n_classes], dtype=np.intp), 1)
+        tree.__setstate__({
+            "max_depth": forest.max_depth,
+            "node_count": len(local),
+            "nodes": nodes,
+            "values": np.ascontiguousarray(forest.value[start:stop][:, np.newaxis, :]),
+        })
+        estimator = DecisionTreeClassifier()
+        estimator.tree_ = tree
+        estimator.n_outputs_ = 1
+        estimator.n_classes_ = n_classes
+        estimator.classes_ = forest.classes_
+        estimator.n_features_in_ = forest.n_features_in_
+        estimators.append(estimator)
+
+    clf = RandomForestClassifier(n_estimators=len(estimators))
+    clf.estimators_ = estimators
+    clf.n_outputs_ = 1
+    clf.n_classes_ = n_classes
+    clf.classes_ = forest.classes_
+    clf.n_features_in_ = forest.n_features_in_
+    return clf
+
+
+def column_order(model, features) -> Optional[np.ndarray]:
+    """Indices taking ``features``-ordered columns to the model's training order.
+
+    None when the columns already line up or the model was fitted without
+    feature names (it then expects ``features`` order).
+    """
+    names = getattr(model, "feature_names_in_", None)
+    if names is None:
+        return None
+    features = list(features)
+    missing = [name for name in names if name not in features]
+    if missing:
+        raise ValueError(f"Model expects features {missing} that are not provided.")
+    order = np.array([features.index(name) for name in names], dtype=np.intp)
+    if len(order) == len(features) and np.array_equal(order, np.arange(len(features))):
+        return None
+    return order
+
+
+def model_input(model, rows: np.ndarray, order: Optional[np.ndarray] = None):
+    """``rows`` in training column order, as the model's predict_proba takes them.
+
+    A ``FlatForest`` gets the bare array (no DataFrame is built); sklearn
+    estimators fitted with feature names still get a DataFrame, since they
+    warn on unnamed input.
+    """
+    if order is not None:
+        rows = rows[:, order]
+    names = getattr(model, "feature_names_in_", None)
+    if isinstance(model, FlatForest) or names is None:
+        return rows
+    return pd.DataFrame(rows, columns=names)
+
+
+def decision_threshold(model, default: Optional[float] = None) -> Optional[float]:
+    """Decision threshold recorded in a flat forest's metadata, else ``default``."""
+    meta = getattr(model, "meta", None) or {}
+    threshold = meta.get("decision_threshold")
+    return default if threshold is None else float(threshold)
+
+
+def threshold_predictions(proba: np.ndarray, classes, threshold: float) -> tuple:
+    """Predicted classes and probability of class 1 per row of ``predict_proba`` output.
+
+    Class 1 is predicted strictly above ``threshold``, so the default of 0.5
+    resolves ties to class 0 exactly like ``argmax`` / ``predict``.
+    """
+    probabilities = proba[:, list(classes).index(1)]
+    predictions = (probabilities > threshold).astype(np.int64)
+    return predictions, probabilities
+
+
+def load_forest(
+    path: str, mmap: bool = True, vectorized_max_rows: Optional[int] = DEFAULT_VECTORIZED_MAX_ROWS
+) -> FlatForest:
+    """Load a forest written by ``export_forest`` (memory-mapped by default).
+
+    Batches larger than ``vectorized_max_rows`` are scored by the rebuilt
+    sklearn estimator; None always uses the vectorized walk.
+    """
+    try:
+        with open(os.path.join(path, "meta.json")) as f:
+            meta = json.load(f)
+        if meta.get("format_version") != FORMAT_VERSION:
+            raise ValueError(f"Unsupported forest format version: {meta.get('format_version')}")
+
+        mode = "r" if mmap else None
+        arrays = {name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode=mode) for name in ARRAYS}
+        forest = FlatForest(arrays, meta)
+        forest.vectorized_max_rows = vectorized_max_rows
+        return forest
+    except Exception as e:
+        raise Exception(f"Error loading forest from {path}: {e}")
+
+
+def load_artifact(
+    path: str,
+    mmap: bool = True,
+    vectorized: bool = False,
+    vectorized_max_rows: Optional[int] = DEFAULT_VECTORIZED_MAX_ROWS,
+):
+    """Load either a flat forest directory or a pickled model file.
+
+    With ``vectorized`` a pickled sklearn forest is flattened into a
+    ``FlatForest`` after loading, so both formats serve through the same
+    vectorized engine. ``vectorized_max_rows`` is the flat forest's size
+    dispatch (see ``FlatForest``).
+    """
+    if os.path.isdir(path):
+        return load_forest(path, mmap=mmap, vectorized_max_rows=vectorized_max_rows)
+    with open(path, "rb") as f:
+        model = pickle.load(f)
+    if vectorized and hasattr(model, "estimators_"):
+        forest = FlatForest.from_estimator(model)
+        forest.vectorized_max_rows = vectorized_max_rows
+        model = forest
+    return model
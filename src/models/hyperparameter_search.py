@@ -0,0 +1,233 @@
+"""Hyperparameter search for the random forest.
+
+Every combination of the ``hyperparameter_search`` grid in params.yaml is
+cross-validated with successive halving: all candidates are first scored on
+a small subsample of the training data, only the best ``1 / halving_factor``
+advance to the next rung with ``halving_factor`` times more rows, and so on
+until the survivors are scored on the full training set.
+
+(candidate, rung, fold) fits run in parallel on a process pool whose
+workers load the training data once. Each fold result is cached on disk
+under a key built from the forest parameters, the fold layout and a hash of
+the training data, so rerunning after adding a grid value or changing an
+unrelated parameter only fits what is new.
+
+Writes the winner to ``models/best_params.json`` (read by model_building)
+and every rung's scores to ``reports/hyperparameter_search.json``.
+"""
+import hashlib
+import itertools
+import json
+import math
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import yaml
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.metrics import get_scorer
+from sklearn.model_selection import StratifiedKFold
+
+# Make the project root importable for the shared src.* modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+from src.data.storage import TARGET, data_hash, dataset_path, read_table
+
+SEARCH_SPACE = ("max_depth", "max_features", "min_samples_leaf", "n_estimators")
+DEFAULTS = {
+    "cv_folds": 5,
+    "halving_factor": 3,
+    "min_samples": 500,
+    "scoring": "accuracy",
+    "random_state": 42,
+    "n_jobs": -1,
+    "cache_dir": os.path.join(".cache", "hyperparameter_search"),
+}
+
+
+def load_params(param_path: str) -> dict:
+    try:
+        with open(param_path) as f:
+            params = yaml.safe_load(f)
+        return {**DEFAULTS, **params["hyperparameter_search"]}
+    except Exception as e:
+        raise Exception(f"Error loading parameters from {param_path}: {e}")
+
+
+def candidates(params: dict) -> list:
+    """Every combination of the grid values, as estimator keyword dicts."""
+    grid = {name: params[name] for name in SEARCH_SPACE if name in params}
+    return [dict(zip(grid, values)) for values in itertools.product(*grid.values())]
+
+
+def rung_sizes(n_candidates: int, n_samples: int, factor: int, min_samples: int) -> list:
+    """Training rows used at each rung; the last rung uses every row."""
+    n_rungs = 1 + int(math.log(max(n_candidates, 1), factor) + 1e-9)
+    while n_rungs > 1 and n_samples / factor ** (n_rungs - 1) < min_samples:
+        n_rungs -= 1
+    return [int(n_samples / factor ** (n_rungs - 1 - rung)) for rung in range(n_rungs)]
+
+
+# ==============================================================
+# Fold Cache
+# ==============================================================
+class FoldCache:
+    """One JSON file per (forest params, fold layout, data) fold result."""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def key(**parts) -> str:
+        return hashlib.sha1(json.dumps(parts, sort_keys=True).encode()).hexdigest()
+
+    def get(self, key: str):
+        path = os.path.join(self.directory, key + ".json")
+        if not os.path.exists(path):
+            self.misses += 1
+            return None
+        self.hits += 1
+        with open(path) as f:
+            return json.load(f)
+
+    def put(self, key: str, result: dict) -> None:
+        # Write-then-rename so an interrupted run never leaves a torn entry
+        path = os.path.join(self.directory, key + ".json")
+        with open(path + ".tmp", "w") as f:
+            json.dump(result, f)
+        os.replace(path + ".tmp", path)
+
+
+# ==============================================================
+# Worker Processes
+# ==============================================================
+_worker_data = {}
+
+
+def _init_worker(train_path: str, random_state: int) -> None:
+    """Process pool initializer: read the training data once per worker."""
+    df = read_table(train_path)
+    X = df.drop(columns=[TARGET]).to_numpy(dtype=np.float32)
+    y = df[TARGET].to_numpy()
+    order = np.random.default_rng(random_state).permutation(len(y))
+    _worker_data.update(X=X[order], y=y[order])
+
+
+def _fit_fold(estimator_params: dict, n_rows: int, fold: int, n_folds: int, scoring: str, random_state: int) -> dict:
+    """Fit on one CV fold of the first ``n_rows`` (shuffled) rows and score it."""
+    X, y = _worker_data["X"][:n_rows], _worker_data["y"][:n_rows]
+    splitter = StratifiedKFold(n_splits=n_folds, shuffle=True, random_state=random_state)
+    train_index, test_index = next(itertools.islice(splitter.split(X, y), fold, None))
+
+    started = time.perf_counter()
+    clf = RandomForestClassifier(**estimator_params, random_state=random_state, n_jobs=1)
+    clf.fit(X[train_index], y[train_index])
+    fit_seconds = time.perf_counter() - started
+    score = get_scorer(scoring)(clf, X[test_index], y[test_index])
+    return {"score": float(score), "fit_seconds": round(fit_seconds, 4)}
+
+
+# ==============================================================
+# Successive Halving
+# ==============================================================
+def successive_halving(train_path: str, params: dict) -> dict:
+    df = read_table(train_path)
+    n_samples = len(df)
+    fingerprint = data_hash(df)
+    del df
+
+    pool_size = os.cpu_count() if params["n_jobs"] in (-1, None) else params["n_jobs"]
+    cache = FoldCache(params["cache_dir"])
+    remaining = candidates(params)
+    sizes = rung_sizes(len(remaining), n_samples, params["halving_factor"], params["min_samples"])
+    n_folds = params["cv_folds"]
+    rungs = []
+
+    with ProcessPoolExecutor(
+        max_workers=pool_size, initializer=_init_worker, initargs=(train_path, params["random_state"])
+    ) as pool:
+        for rung, n_rows in enumerate(sizes):
+            started = time.perf_counter()
+            folds = {}
+            for index, candidate in enumerate(remaining):
+                for fold in range(n_folds):
+                    key = cache.key(
+                        params=candidate, fold=fold, n_folds=n_folds, n_rows=n_rows, data=fingerprint,
+                        scoring=params["scoring"], random_state=params["random_state"],
+                    )
+                    result = cache.get(key)
+                    if result is None:
+                        result = pool.submit(
+                            _fit_fold, candidate, n_rows, fold, n_folds, params["scoring"], params["random_state"]
+                        )
+                    folds[index, fold] = (key, result)
+
+            results = []
+            for index, candidate in enumerate(remaining):
+                scores = []
+                for fold in range(n_folds):
+                    key, result = folds[index, fold]
+                    if not isinstance(result, dict):
+                        result = result.result()
+                        cache.put(key, result)
+                    scores.append(result["score"])
+                results.append({"params": candidate, "mean_score": float(np.mean(scores)), "std_score": float(np.std(scores))})
+
+            results.sort(key=lambda r: r["mean_score"], reverse=True)
+            rungs.append({
+                "rung": rung,
+                "n_rows": n_rows,
+                "n_candidates": len(remaining),
+                "seconds": round(time.perf_counter() - started, 3),
+                "results": results,
+            })
+            print(f"Rung {rung}: {len(remaining)} candidates on {n_rows} rows, best {results[0]['mean_score']:.4f}")
+
+            keep = max(1, math.ceil(len(remaining) / params["halving_factor"]))
+            remaining = [r["params"] for r in results[:keep]]
+
+    best = rungs[-1]["results"][0]
+    return {
+        "best_params": best["params"],
+        "best_score": best["mean_score"],
+        "scoring": params["scoring"],
+        "cv_folds": n_folds,
+        "data_hash": fingerprint,
+        "cache": {"hits": cache.hits, "misses": cache.misses},
+        "rungs": rungs,
+    }
+
+
+def main():
+    try:
+        params = load_params("params.yaml")
+        train_path = dataset_path(os.path.join("data", "preprocessing"), "train_processed")
+        if not os.path.exists(train_path):
+            raise FileNotFoundError(f"{train_path} not found. Please run data collection/preprocessing first.")
+
+        started = time.perf_counter()
+        search = successive_halving(train_path, params)
+        search["seconds"] = round(time.perf_counter() - started, 3)
+
+        os.makedirs("models", exist_ok=True)
+        with open(os.path.join("models", "best_params.json"), "w") as f:
+            json.dump({key: search[key] for key in ("best_params", "best_score", "scoring", "data_hash")}, f, indent=4)
+
+        os.makedirs("reports", exist_ok=True)
+        with open(os.path.join("reports", "hyperparameter_search.json"), "w") as f:
+            json.dump(search, f, indent=4)
+
+        print(f"Best params: {search['best_params']} ({search['scoring']} {search['best_score']:.4f})")
+        print(f"Fold cache: {search['cache']['hits']} hits, {search['cache']['misses']} fits in {search['seconds']}s")
+
+    except Exception as e:
+        print(f"Error in hyperparameter search: {e}")
+        raise
+
+
+if __name__ == "__main__":
+    main()
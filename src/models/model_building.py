@@ -1,36 +1,87 @@
-import pandas as pd
 import numpy as np
+import json
 import pickle
+import resource
+import time
 import yaml
 import os
+import sys
 import wandb
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.metrics import accuracy_score, precision_score, recall_score, f1_score
+from forest_format import export_forest
+
+# Make the project root importable for the shared src.* modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+from src.data.storage import data_hash, dataset_path, read_table
 
 def load_params(param_path):
     with open(param_path) as f:
         return yaml.safe_load(f)
 
 def load_data(file_path):
-    return pd.read_csv(file_path)
+    return read_table(file_path)
+
+def peak_memory_mb():
+    """Peak resident memory of this process so far (ru_maxrss is KiB on Linux)."""
+    scale = 1024 * 1024 if sys.platform == 'darwin' else 1024
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale
+
+def load_warm_start(model_path, estimator_params, fingerprint):
+    """Previously saved forest to grow, or None if it cannot be reused.
+
+    Reusable only if it was trained on the same data with the same
+    parameters apart from n_estimators. Trees are seeded in order from
+    random_state, so adding trees (or dropping the last ones) yields exactly
+    the forest a full retrain would.
+    """
+    if not os.path.exists(model_path):
+        return None
+    with open(model_path, 'rb') as f:
+        previous = pickle.load(f)
+    if not isinstance(previous, RandomForestClassifier) or getattr(previous, 'data_hash_', None) != fingerprint:
+        return None
+
+    wanted = RandomForestClassifier(**estimator_params, random_state=42).get_params()
+    current = previous.get_params()
+    if any(current[key] != wanted[key] for key in wanted if key not in ('n_estimators', 'n_jobs', 'warm_start')):
+        return None
+
+    n_estimators = wanted['n_estimators']
+    if n_estimators < len(previous.estimators_):
+        previous.estimators_ = previous.estimators_[:n_estimators]
+    previous.set_params(n_estimators=n_estimators, warm_start=True)
+    return previous
+
+def load_tuned_params(file_path):
+    """Forest parameters chosen by the hyperparameter search stage ({} if absent)."""
+    if not os.path.exists(file_path):
+        return {}
+    with open(file_path) as f:
+        return json.load(f)['best_params']
 
 def main():
     try:
         # Load params
         params = load_params('params.yaml')
         n_estimators = params['model_building']['n_estimators']
+        n_jobs = params['model_building'].get('n_jobs', -1)
+        warm_start = params['model_building'].get('warm_start', True)
+        estimator_params = {'n_estimators': n_estimators}
+        if params['model_building'].get('use_search', False):
+            estimator_params.update(load_tuned_params(os.path.join('models', 'best_params.json')))
 
         # Initialize W&B
         wandb.init(project="water-potability-prediction", job_type="train")
-        wandb.config.n_estimators = n_estimators
+        wandb.config.update(estimator_params)
 
         # Load data
-        train_path = os.path.join('data', 'preprocessing', 'train_processed.csv')
+        train_path = dataset_path(os.path.join('data', 'preprocessing'), 'train_processed')
         # Check if file exists
         if not os.path.exists(train_path):
              raise FileNotFoundError(f"{train_path} not found. Please run data collection/preprocessing first.")
         
-        train_df = pd.read_csv(train_path)
+        train_df = load_data(train_path)
         
         # Prepare X and y
         # Assuming the last column or "Potability" is target.
@@ -45,10 +96,36 @@ def main():
         X_train = train_df.drop(columns=[target_col])
         y_train = train_df[target_col]
 
-        # Train model
-        print("Training model...")
-        clf = RandomForestClassifier(n_estimators=n_estimators, random_state=42)
-        clf.fit(X_train, y_train)
+        # Train model, growing the previous forest when only n_estimators changed
+        models_dir = 'models'
+        model_path = os.path.join(models_dir, 'rf_model.pkl')
+        fingerprint = data_hash(train_df)
+        clf = load_warm_start(model_path, estimator_params, fingerprint) if warm_start else None
+        reused = len(clf.estimators_) if clf is not None else 0
+        if clf is None:
+            clf = RandomForestClassifier(**estimator_params, random_state=42)
+        clf.set_params(n_jobs=n_jobs)
+
+        print(f"Training model with {estimator_params} ({reused} trees reused, n_jobs={n_jobs})...")
+        started = time.perf_counter()
+        if reused < clf.n_estimators:
+            clf.fit(X_train, y_train)
+        training_seconds = time.perf_counter() - started
+
+        # Serve with the default single-threaded predict; remember the data for warm starts
+        clf.set_params(n_jobs=None, warm_start=False)
+        clf.data_hash_ = fingerprint
+
+        training_metrics = {
+            "training_seconds": round(training_seconds, 3),
+            "peak_memory_mb": round(peak_memory_mb(), 1),
+            "n_estimators": len(clf.estimators_),
+            "trees_reused": reused,
+            "trees_trained": len(clf.estimators_) - reused,
+            "n_jobs": n_jobs,
+        }
+        print(f"Training metrics: {training_metrics}")
+        wandb.log(training_metrics)
 
         # Log training accuracy
         train_preds = clf.predict(X_train)
@@ -57,16 +134,21 @@ def main():
         print(f"Training Accuracy: {train_acc}")
 
         # Save model
-        models_dir = 'models'
         os.makedirs(models_dir, exist_ok=True)
-        model_path = os.path.join(models_dir, 'rf_model.pkl')
-        
+        os.makedirs('reports', exist_ok=True)
+        with open(os.path.join('reports', 'training_metrics.json'), 'w') as f:
+            json.dump(training_metrics, f, indent=4)
+
         with open(model_path, 'wb') as f:
             pickle.dump(clf, f)
+
+        # Export the flat, memory-mappable copy used for serving
+        forest_dir = export_forest(clf, os.path.join(models_dir, 'rf_forest'))
         
         # Log model artifact
         artifact = wandb.Artifact('rf_model', type='model')
         artifact.add_file(model_path)
+        artifact.add_dir(forest_dir, name='rf_forest')
         wandb.log_artifact(artifact)
         
         print("Model training completed and logged to W&B.")
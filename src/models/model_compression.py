@@ -0,0 +1,282 @@
+"""Compress the trained forest for serving.
+
+Trees are ranked by greedy forward selection on the validation split: each
+step adds the tree that most lowers the validation log loss of the averaged
+prediction, so the first k trees of the ranking are the best k-tree
+sub-forest found. Optionally the full forest is also distilled into a small
+forest trained on its labels over the training data plus jittered copies.
+
+Every candidate (the original, each pruned size in ``tree_counts`` and the
+distilled forest) is measured for on-disk size, single-row latency, batch
+throughput and validation accuracy. Pruned sizes are scored by cross-fitting:
+the validation split is cut into ``selection_folds`` stratified folds and
+each fold is predicted by sub-forests ranked on the other folds only, so
+the ranking never sees the rows its accuracy is measured on. The served artifact is the most
+accurate candidate within ``max_latency_ms`` whose accuracy is at most
+``max_accuracy_drop`` below the original (the fastest acceptable candidate
+if none meets the latency budget). It is exported to ``models/rf_served``
+and the comparison is written to ``reports/compression.json``.
+"""
+import copy
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+import pickle
+import yaml
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.model_selection import StratifiedKFold
+
+from forest_format import FlatForest, export_forest
+
+# Make the project root importable for the shared src.* modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+from src.data.storage import TARGET, dataset_path, read_table
+
+DEFAULTS = {
+    "tree_counts": [10, 25, 50, 100, 200],
+    "max_validation_rows": 20000,
+    "distill": True,
+    "distill_trees": 25,
+    "distill_max_depth": 12,
+    "distill_augment": 3,
+    "distill_noise": 0.1,
+    "max_latency_ms": 2.0,
+    "max_accuracy_drop": 0.005,
+    "latency_repeats": 200,
+    "selection_folds": 5,
+    "decision_threshold": 0.5,
+}
+
+
+def load_params(param_path: str) -> dict:
+    try:
+        with open(param_path) as f:
+            params = yaml.safe_load(f)
+        return {**DEFAULTS, **params.get("model_compression", {})}
+    except Exception as e:
+        raise Exception(f"Error loading parameters from {param_path}: {e}")
+
+
+# ==============================================================
+# Tree Ranking / Pruning
+# ==============================================================
+def tree_probabilities(clf, X: pd.DataFrame) -> np.ndarray:
+    """(n_trees, n_samples) probability of the positive class from each tree."""
+    positive = list(clf.classes_).index(1)
+    # Trees are fitted on bare arrays; pass one in the forest's feature order
+    if hasattr(clf, "feature_names_in_"):
+        X = X[list(clf.feature_names_in_)]
+    X = np.asarray(X, dtype=np.float32)
+    return np.stack([tree.predict_proba(X)[:, positive] for tree in clf.estimators_])
+
+
+def rank_trees(P: np.ndarray, y: np.ndarray, max_trees: int) -> tuple[list, list]:
+    """Greedy forward selection of trees by validation log loss.
+
+    Returns the selection order and the validation log loss / accuracy after
+    each addition.
+    """
+    n_trees = P.shape[0]
+    total = np.zeros(P.shape[1])
+    available = np.ones(n_trees, dtype=bool)
+    order, curve = [], []
+    for k in range(min(max_trees, n_trees)):
+        proba = np.clip((total + P) / (k + 1), 1e-6, 1 - 1e-6)
+        loss = -(y * np.log(proba) + (1 - y) * np.log(1 - proba)).mean(axis=1)
+        loss[~available] = np.inf
+        best = int(np.argmin(loss))
+        order.append(best)
+        available[best] = False
+        total += P[best]
+        accuracy = float(((total / (k + 1) > 0.5) == y).mean())
+        curve.append({"trees": k + 1, "log_loss": round(float(loss[best]), 6), "accuracy": round(accuracy, 6)})
+    return order, curve
+
+
+def cross_fit_predictions(P: np.ndarray, y: np.ndarray, counts: list, folds: int) -> dict:
+    """Out-of-fold class predictions of each pruned size in ``counts``.
+
+    Every fold is predicted by the first k trees of a ranking fitted on the
+    other folds, so the accuracy of these predictions is an unbiased estimate
+    for the procedure (the ranking is otherwise scored on its own data).
+    """
+    folds = min(folds, int(np.bincount(y.astype(np.intp)).min()))
+    if folds < 2:
+        raise ValueError("Too few validation rows per class to cross-fit the tree ranking.")
+
+    predictions = {k: np.empty(len(y), dtype=np.int64) for k in counts}
+    splitter = StratifiedKFold(n_splits=folds, shuffle=True, random_state=42)
+    for fit, held_out in splitter.split(P.T, y):
+        order, _ = rank_trees(P[:, fit], y[fit], max(counts))
+        running = np.cumsum(P[order][:, held_out], axis=0)
+        for k in counts:
+            # Strictly above 0.5, like predict() resolving ties to class 0
+            predictions[k][held_out] = running[k - 1] / k > 0.5
+    return predictions
+
+
+def subforest(clf, indices: list):
+    """Shallow copy of ``clf`` keeping only the trees at ``indices``."""
+    pruned = copy.copy(clf)
+    pruned.estimators_ = [clf.estimators_[i] for i in indices]
+    pruned.n_estimators = len(indices)
+    return pruned
+
+
+# ==============================================================
+# Distillation
+# ==============================================================
+def distill(clf, X_train: pd.DataFrame, params: dict):
+    """Small forest trained to reproduce ``clf`` on a jittered transfer set."""
+    rng = np.random.default_rng(42)
+    X = X_train.to_numpy(dtype=np.float64)
+    scale = X.std(axis=0) * params["distill_noise"]
+    transfer = np.vstack([X] + [X + rng.normal(size=X.shape) * scale for _ in range(params["distill_augment"])])
+    transfer = pd.DataFrame(transfer, columns=X_train.columns)
+    labels = FlatForest.from_estimator(clf).predict(transfer)
+
+    student = RandomForestClassifier(
+        n_estimators=params["distill_trees"],
+        max_depth=params["distill_max_depth"],
+        random_state=42,
+        n_jobs=-1,
+    )
+    student.fit(transfer, labels)
+    student.set_params(n_jobs=None)
+    return student
+
+
+# ==============================================================
+# Measurement / Selection
+# ==============================================================
+def artifact_bytes(clf) -> int:
+    """Size of the flat forest export on disk."""
+    directory = tempfile.mkdtemp()
+    try:
+        export_forest(clf, directory)
+        return sum(os.path.getsize(os.path.join(directory, name)) for name in os.listdir(directory))
+    finally:
+        shutil.rmtree(directory)
+
+
+def measure(name: str, clf, X_val: pd.DataFrame, y_val: np.ndarray, repeats: int,
+            held_out: np.ndarray = None) -> dict:
+    """Size, latency, throughput and accuracy of one candidate.
+
+    ``held_out`` replaces the candidate's own validation predictions for the
+    accuracy (the out-of-fold predictions of a pruned size).
+    """
+    forest = FlatForest.from_estimator(clf)
+    rows = X_val.to_numpy(dtype=np.float64)
+
+    latencies = []
+    for i in range(repeats):
+        row = rows[i % len(rows)][None, :]
+        started = time.perf_counter()
+        forest.predict_proba(row)
+        latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    predictions = forest.predict(rows)
+    batch_seconds = time.perf_counter() - started
+    if held_out is not None:
+        predictions = held_out
+
+    return {
+        "name": name,
+        "n_trees": len(clf.estimators_),
+        "n_nodes": int(sum(tree.tree_.node_count for tree in clf.estimators_)),
+        "size_bytes": artifact_bytes(clf),
+        "latency_ms_p50": round(float(np.median(latencies)) * 1000, 4),
+        "throughput_rows_per_s": round(len(rows) / batch_seconds, 1) if batch_seconds > 0 else None,
+        "accuracy": round(float((predictions == y_val).mean()), 6),
+    }
+
+
+def choose(results: list, params: dict) -> dict:
+    """Pick the served candidate according to the latency / accuracy budget."""
+    floor = results[0]["accuracy"] - params["max_accuracy_drop"]
+    acceptable = [r for r in results if r["accuracy"] >= floor]
+    within = [r for r in acceptable if r["latency_ms_p50"] <= params["max_latency_ms"]]
+    if within:
+        return max(within, key=lambda r: (r["accuracy"], -r["latency_ms_p50"]))
+    print(f"No candidate meets the {params['max_latency_ms']} ms budget; serving the fastest acceptable one.")
+    return min(acceptable, key=lambda r: r["latency_ms_p50"])
+
+
+def main():
+    try:
+        params = load_params("params.yaml")
+        processed = os.path.join("data", "preprocessing")
+        model_path = os.path.join("models", "rf_model.pkl")
+        served_path = os.path.join("models", "rf_served")
+        for path in (model_path, dataset_path(processed, "validation_processed")):
+            if not os.path.exists(path):
+                raise FileNotFoundError(f"{path} not found.")
+
+        with open(model_path, "rb") as f:
+            clf = pickle.load(f)
+
+        validation = read_table(dataset_path(processed, "validation_processed"))
+        if len(validation) == 0:
+            raise ValueError("The validation split is empty; set data_collection.validation_size above 0.")
+        if len(validation) > params["max_validation_rows"]:
+            validation = validation.sample(params["max_validation_rows"], random_state=42)
+        X_val = validation.drop(columns=[TARGET])
+        y_val = validation[TARGET].to_numpy()
+
+        # Rank trees once; every pruned size is a prefix of the ranking
+        print("Ranking trees by marginal validation contribution...")
+        counts = sorted(k for k in params["tree_counts"] if k < len(clf.estimators_))
+        P = tree_probabilities(clf, X_val)
+        order, curve = rank_trees(P, y_val, max(counts, default=0))
+        # Accuracy of each pruned size on rows its ranking did not see
+        held_out = {}
+        if counts:
+            held_out = {
+                f"pruned_{k}": predictions
+                for k, predictions in cross_fit_predictions(P, y_val, counts, params["selection_folds"]).items()
+            }
+
+        candidates = [("original", clf)]
+        candidates += [(f"pruned_{k}", subforest(clf, order[:k])) for k in counts]
+        if params["distill"]:
+            print("Distilling the forest...")
+            X_train = read_table(dataset_path(processed, "train_processed")).drop(columns=[TARGET])
+            candidates.append(("distilled", distill(clf, X_train, params)))
+
+        results = [
+            measure(name, model, X_val, y_val, params["latency_repeats"], held_out=held_out.get(name))
+            for name, model in candidates
+        ]
+        for result in results:
+            print(result)
+
+        chosen = choose(results, params)
+        export_forest(dict(candidates)[chosen["name"]], served_path, decision_threshold=params["decision_threshold"])
+        print(f"Serving '{chosen['name']}' from {served_path}")
+
+        os.makedirs("reports", exist_ok=True)
+        with open(os.path.join("reports", "compression.json"), "w") as f:
+            json.dump({
+                "chosen": chosen["name"],
+                "budget": {key: params[key] for key in ("max_latency_ms", "max_accuracy_drop")},
+                "validation_rows": len(y_val),
+                "selection_folds": params["selection_folds"],
+                "candidates": results,
+                "pruning_curve": curve,
+            }, f, indent=4)
+
+    except Exception as e:
+        print(f"Error in model compression: {e}")
+        raise
+
+
+if __name__ == "__main__":
+    main()
@@ -1,25 +1,72 @@
 import pandas as pd
 import numpy as np
-import pickle
 import json
 import os
+import sys
 import wandb
+import yaml
 from sklearn.metrics import accuracy_score, precision_score, recall_score, f1_score
+from forest_format import DEFAULT_DECISION_THRESHOLD, decision_threshold, load_artifact, threshold_predictions
+from evaluation_metrics import SortedScores, bootstrap, calibration, curve_metrics, operating_points, threshold_sweep
+
+# Make the project root importable for the shared src.* modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+from src.data.storage import dataset_path, read_table, write_table
+
+# Per-row predictions of the served model on the test set, read by the
+# downstream stages instead of running the model again
+PREDICTIONS_PATH = dataset_path(os.path.join('data', 'evaluation'), 'test_predictions')
+
+DEFAULTS = {
+    "calibration_bins": 10,
+    "bootstrap_samples": 1000,
+    "confidence": 0.95,
+    "random_state": 42,
+}
+
 
 def load_data(file_path):
-    return pd.read_csv(file_path)
+    return read_table(file_path)
+
+
+def load_params(param_path):
+    try:
+        with open(param_path) as f:
+            params = yaml.safe_load(f)
+        return {**DEFAULTS, **params.get("model_evaluation", {})}
+    except Exception as e:
+        raise Exception(f"Error loading parameters from {param_path}: {e}")
+
+
+def probability_report(y_true, y_proba, y_pred, params):
+    """Curves, threshold sweep, calibration and bootstrap CIs from one sort of the scores."""
+    scores = SortedScores(y_true, y_proba, y_pred)
+    tps, fps = scores.counts()
+    curves = {name: float(value) for name, value in curve_metrics(tps, fps).items()}
+    sweep = threshold_sweep(scores)
+    report = {
+        **curves,
+        "operating_points": operating_points(sweep),
+        "calibration": calibration(y_true, y_proba, params["calibration_bins"]),
+        "bootstrap": bootstrap(
+            scores, params["bootstrap_samples"], params["confidence"], params["random_state"]
+        ),
+    }
+    return report, pd.DataFrame(sweep)
 
 def main():
     try:
+        params = load_params('params.yaml')
+
         # Initialize W&B
         wandb.init(project="water-potability-prediction", job_type="evaluate")
 
         # Load data
-        test_path = os.path.join('data', 'preprocessing', 'test_processed.csv')
+        test_path = dataset_path(os.path.join('data', 'preprocessing'), 'test_processed')
         if not os.path.exists(test_path):
              raise FileNotFoundError(f"{test_path} not found.")
         
-        test_df = pd.read_csv(test_path)
+        test_df = load_data(test_path)
         
         target_col = 'Potability'
         X_test = test_df.drop(columns=[target_col])
@@ -28,16 +75,28 @@ def main():
         # Load model with artifact handling
         # For now, load local model, but in a real pipeline we might download from registry.
         # But this script runs locally after training stage in DVC.
-        model_path = os.path.join('models', 'rf_model.pkl')
+        # Evaluate the artifact that is actually served (see model_compression.py)
+        model_path = os.path.join('models', 'rf_served')
         if not os.path.exists(model_path):
              raise FileNotFoundError(f"{model_path} not found.")
         
-        with open(model_path, 'rb') as f:
-            model = pickle.load(f)
+        model = load_artifact(model_path)
+        # Label rows with the threshold the API serves (meta.json)
+        threshold = decision_threshold(model, DEFAULT_DECISION_THRESHOLD)
+
+        # Predict (one pass: classes and probabilities from predict_proba)
+        print(f"Evaluating model at decision threshold {threshold}...")
+        proba = model.predict_proba(X_test)
+        y_pred, y_proba = threshold_predictions(proba, model.classes_, threshold)
 
-        # Predict
-        print("Evaluating model...")
-        y_pred = model.predict(X_test)
+        predictions = pd.DataFrame({
+            target_col: y_test.to_numpy(),
+            'prediction': y_pred.astype(np.int64),
+            'probability': y_proba,
+        })
+        # float32=False keeps the probabilities exact for threshold analysis
+        write_table(predictions, PREDICTIONS_PATH, float32=False)
+        print(f"Predictions saved to {PREDICTIONS_PATH}")
 
         # Metrics
         acc = accuracy_score(y_test, y_pred)
@@ -45,11 +104,17 @@ def main():
         recall = recall_score(y_test, y_pred)
         f1 = f1_score(y_test, y_pred)
 
+        # Probability-based metrics
+        report, sweep = probability_report(y_test.to_numpy(), y_proba, y_pred, params)
+
         metrics = {
             "test_accuracy": acc,
             "test_precision": precision,
             "test_recall": recall,
-            "test_f1": f1
+            "test_f1": f1,
+            "test_roc_auc": report["roc_auc"],
+            "test_average_precision": report["average_precision"],
+            "test_brier_score": report["calibration"]["brier_score"],
         }
         
         print(f"Metrics: {metrics}")
@@ -62,6 +127,14 @@ def main():
         
         with open(metrics_path, 'w') as f:
             json.dump(metrics, f, indent=4)
+
+        # Detailed report and the full threshold sweep (ROC / PR curves)
+        with open(os.path.join(reports_dir, 'evaluation.json'), 'w') as f:
+            json.dump({"decision_threshold": threshold, "metrics_at_served_threshold": metrics, **report}, f, indent=4)
+        sweep.to_csv(os.path.join(reports_dir, 'threshold_sweep.csv'), index=False)
+
+        best = report["operating_points"]["max_f1"]
+        print(f"Best F1 {best['f1']:.4f} at threshold {best['threshold']:.4f}")
             
         print("Evaluation completed.")
         wandb.finish()
@@ -0,0 +1,201 @@
+"""Parallel, incremental figure rendering.
+
+A figure is described by a ``FigureJob``: a module-level plot function, the
+frame and columns it reads and its keyword parameters. ``render_figures``
+gives every job a content key -- a hash of its input columns, parameters
+and the source of the plot function and of the project code it calls
+(``code_sources``) -- and skips jobs whose key matches the
+one recorded in ``manifest.json`` next to the figures. The remaining jobs
+run on a process pool whose workers use the non-interactive Agg backend
+and receive the frames once, in the pool initializer. The manifest records
+each figure's key and render time.
+"""
+import hashlib
+import inspect
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Callable, Dict, List, Optional
+
+import matplotlib
+matplotlib.use("Agg")
+
+import pandas as pd
+
+MANIFEST = "manifest.json"
+
+# Code under this directory (src/) counts towards a figure's key
+SOURCE_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class FigureJob:
+    """One figure: ``plot(frame[columns], **params)`` saved as ``name``.png."""
+
+    def __init__(
+        self,
+        name: str,
+        plot: Callable,
+        frame: str = "data",
+        columns: Optional[List[str]] = None,
+        params: Optional[dict] = None,
+    ):
+        self.name = name
+        self.plot = plot
+        self.frame = frame
+        self.columns = columns
+        self.params = params or {}
+
+    @property
+    def filename(self) -> str:
+        return self.name + ".png"
+
+
+def column_hashes(frame: pd.DataFrame) -> Dict[str, str]:
+    """Content hash of every column (values and dtype, not the index)."""
+    return {
+        str(column): hashlib.sha1(
+            str(frame[column].dtype).encode()
+            + pd.util.hash_pandas_object(frame[column], index=False).to_numpy().tobytes()
+        ).hexdigest()
+        for column in frame.columns
+    }
+
+
+def is_project_code(obj) -> bool:
+    try:
+        path = inspect.getsourcefile(obj)
+    except TypeError:  # built-in
+        return False
+    return path is not None and os.path.abspath(path).startswith(SOURCE_ROOT + os.sep)
+
+
+def code_names(code) -> set:
+    """Global names used by a code object, including nested functions and comprehensions."""
+    names = set(code.co_names)
+    for const in code.co_consts:
+        if inspect.iscode(const):
+            names |= code_names(const)
+    return names
+
+
+def code_sources(plot: Callable) -> Dict[str, str]:
+    """Source of ``plot`` and of every project function, class or module it uses.
+
+    Global names are followed recursively through project code, so a change
+    to a helper (e.g. ``large_data.fft_kde``) changes the key of every figure
+    that calls it, and only those. Simple module-level constants are
+    included by value.
+    """
+    sources, pending = {}, [plot]
+    while pending:
+        obj = pending.pop()
+        key = obj.__name__ if inspect.ismodule(obj) else f"{obj.__module__}.{obj.__qualname__}"
+        if key in sources or not is_project_code(obj):
+            continue
+        sources[key] = inspect.getsource(obj)
+        if inspect.ismodule(obj):
+            continue
+
+        functions = [obj] if inspect.isfunction(obj) else [m for m in vars(obj).values() if inspect.isfunction(m)]
+        for function in functions:
+            for name in code_names(function.__code__):
+                value = function.__globals__.get(name)
+                if inspect.isfunction(value) or inspect.isclass(value) or inspect.ismodule(value):
+                    pending.append(value)
+                elif isinstance(value, (bool, int, float, str, tuple)):
+                    sources[f"{function.__module__}.{name}"] = repr(value)
+    return sources
+
+
+def job_key(job: FigureJob, hashes: Dict[str, Dict[str, str]]) -> str:
+    columns = job.columns if job.columns is not None else list(hashes[job.frame])
+    parts = {
+        "name": job.name,
+        "code": code_sources(job.plot),
+        "frame": job.frame,
+        "columns": [[column, hashes[job.frame][column]] for column in columns],
+        "params": job.params,
+    }
+    return hashlib.sha1(json.dumps(parts, sort_keys=True, default=str).encode()).hexdigest()
+
+
+# ==============================================================
+# Worker Processes
+# ==============================================================
+_worker_frames: Dict[str, pd.DataFrame] = {}
+
+
+def _init_worker(frames: Dict[str, pd.DataFrame]) -> None:
+    """Process pool initializer: keep the input frames for every job."""
+    matplotlib.use("Agg")
+    _worker_frames.update(frames)
+
+
+def _render(job: FigureJob, path: str) -> float:
+    import matplotlib.pyplot as plt
+
+    started = time.perf_counter()
+    frame = _worker_frames[job.frame]
+    job.plot(frame if job.columns is None else frame[job.columns], **job.params)
+    plt.savefig(path)
+    plt.close("all")
+    return time.perf_counter() - started
+
+
+# ==============================================================
+# Rendering
+# ==============================================================
+def load_manifest(fig_dir: str) -> dict:
+    path = os.path.join(fig_dir, MANIFEST)
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def render_figures(jobs: List[FigureJob], frames: Dict[str, pd.DataFrame], fig_dir: str, n_jobs: int = -1) -> dict:
+    """Render the jobs whose inputs changed; returns the updated manifest."""
+    os.makedirs(fig_dir, exist_ok=True)
+    previous = load_manifest(fig_dir)
+    hashes = {name: column_hashes(frame) for name, frame in frames.items()}
+
+    manifest, pending = {}, []
+    for job in jobs:
+        key = job_key(job, hashes)
+        entry = previous.get(job.name)
+        if entry and entry["key"] == key and os.path.exists(os.path.join(fig_dir, job.filename)):
+            manifest[job.name] = {**entry, "status": "cached"}
+        else:
+            pending.append((job, key))
+
+    # Figures that are no longer produced
+    for name, entry in previous.items():
+        if name not in manifest and all(job.name != name for job, _ in pending):
+            path = os.path.join(fig_dir, entry["file"])
+            if os.path.exists(path):
+                os.remove(path)
+
+    if pending:
+        workers = min(len(pending), os.cpu_count() if n_jobs in (-1, None) else n_jobs)
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(frames,)) as pool:
+            futures = {
+                pool.submit(_render, job, os.path.join(fig_dir, job.filename)): (job, key) for job, key in pending
+            }
+            for future in as_completed(futures):
+                job, key = futures[future]
+                try:
+                    seconds = future.result()
+                except Exception as e:
+                    raise Exception(f"Error rendering figure '{job.name}': {e}")
+                manifest[job.name] = {
+                    "file": job.filename,
+                    "key": key,
+                    "seconds": round(seconds, 3),
+                    "status": "rendered",
+                }
+
+    manifest = {job.name: manifest[job.name] for job in jobs}
+    with open(os.path.join(fig_dir, MANIFEST), "w") as f:
+        json.dump(manifest, f, indent=4)
+    return manifest
@@ -1,12 +1,23 @@
 import os
-import pickle
+import sys
 import pandas as pd
 import numpy as np
+import matplotlib
+matplotlib.use("Agg")
 import matplotlib.pyplot as plt
 import seaborn as sns
 import json
+import time
+import yaml
 from sklearn.metrics import confusion_matrix, ConfusionMatrixDisplay
 
+from large_data import fft_kde, finite_range, histogram2d, stratified_sample
+from rendering import FigureJob, render_figures
+
+# Make the project root importable for the shared src.* modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+from src.data.storage import dataset_path, read_table
+
 # === Setup ===
 REPORT_DIR = os.path.join("reports")
 FIG_DIR = os.path.join(REPORT_DIR, "figures")
@@ -17,154 +28,296 @@ os.makedirs(FIG_DIR, exist_ok=True)
 
 # === Load Data and Model ===
 def load_data(path: str) -> pd.DataFrame:
-    """Load dataset from CSV."""
+    """Load a columnar dataset written by the preprocessing stage."""
     try:
         print(f"Loading data from: {path}")
-        return pd.read_csv(path)
+        return read_table(path)
     except Exception as e:
         raise Exception(f"Error loading data: {e}")
 
 
-def load_model(path: str):
-    """Load trained model."""
+def load_predictions(path: str) -> pd.DataFrame:
+    """Test set predictions persisted by the evaluation stage."""
     try:
-        print(f"Loading model from: {path}")
-        with open(path, "rb") as f:
-            return pickle.load(f)
+        print(f"Loading predictions from: {path}")
+        return read_table(path, columns=["Potability", "prediction"])
     except Exception as e:
-        raise Exception(f"Error loading model: {e}")
+        raise Exception(f"Error loading predictions: {e}")
 
 
-# === Visualization Functions ===
-def basic_visuals(data: pd.DataFrame):
-    """Generate and save basic dataset visualizations."""
-
-    # Histogram
-    plt.figure(figsize=(15, 10))
+# === Plot Functions ===
+# Each draws one figure from its input frame; rendering.py saves and closes
+# it. They live at module level so the worker processes can unpickle them.
+def plot_histograms(data: pd.DataFrame):
     data.hist(figsize=(15, 10))
     plt.suptitle("Feature Distributions", fontsize=16)
     plt.tight_layout()
-    plt.savefig(os.path.join(FIG_DIR, "histograms.png"))
-    plt.close()
 
-    # Pairplot
+
+def plot_pairplot(data: pd.DataFrame):
     sns.pairplot(data)
     plt.suptitle("Pairwise Relationships Between Features", fontsize=16)
-    plt.savefig(os.path.join(FIG_DIR, "pairplot.png"))
-    plt.close()
 
-    # Correlation Heatmap
+
+def plot_heatmap(data: pd.DataFrame):
     plt.figure(figsize=(15, 10))
     sns.heatmap(data.corr(), annot=True, cmap="coolwarm")
     plt.title("Correlation Heatmap", fontsize=16)
     plt.tight_layout()
-    plt.savefig(os.path.join(FIG_DIR, "correlation_heatmap.png"))
-    plt.close()
-
-    # Boxplots
-    for column in data.select_dtypes(include=[np.number]).columns:
-        plt.figure(figsize=(8, 4))
-        sns.boxplot(x=data[column], color="skyblue")
-        plt.title(f"Box plot of {column}", fontsize=14)
-        plt.xlabel(column)
-        plt.tight_layout()
-        plt.savefig(os.path.join(FIG_DIR, f"boxplot_{column}.png"))
-        plt.close()
 
-    # KDE plots (distribution by Potability)
-    if "Potability" in data.columns:
-        for column in data.select_dtypes(include=[np.number]).columns:
-            plt.figure(figsize=(8, 4))
-            sns.kdeplot(data=data, x=column, hue="Potability", fill=True)
-            plt.title(f"Distribution of {column} by Potability", fontsize=14)
-            plt.xlabel(column)
-            plt.tight_layout()
-            plt.savefig(os.path.join(FIG_DIR, f"kde_{column}.png"))
-            plt.close()
 
-    # Scatter Plot between pH and Hardness
-    if all(col in data.columns for col in ["ph", "Hardness", "Potability"]):
-        plt.figure(figsize=(10, 6))
-        sns.scatterplot(x="ph", y="Hardness", hue="Potability", data=data, palette="Set1")
-        plt.title("Scatter Plot: pH vs Hardness by Potability", fontsize=16)
-        plt.xlabel("pH")
-        plt.ylabel("Hardness")
-        plt.tight_layout()
-        plt.savefig(os.path.join(FIG_DIR, "scatter_ph_hardness.png"))
-        plt.close()
-
-
-# === Model Evaluation Visuals ===
-def evaluation_visuals(model, data: pd.DataFrame):
-    """Visualize and save model performance (actual vs predicted and metrics)."""
+def plot_boxplot(data: pd.DataFrame, column: str):
+    plt.figure(figsize=(8, 4))
+    sns.boxplot(x=data[column], color="skyblue")
+    plt.title(f"Box plot of {column}", fontsize=14)
+    plt.xlabel(column)
+    plt.tight_layout()
+
+
+def plot_kde(data: pd.DataFrame, column: str):
+    plt.figure(figsize=(8, 4))
+    sns.kdeplot(data=data, x=column, hue="Potability", fill=True)
+    plt.title(f"Distribution of {column} by Potability", fontsize=14)
+    plt.xlabel(column)
+    plt.tight_layout()
+
+
+def plot_scatter_ph_hardness(data: pd.DataFrame):
+    plt.figure(figsize=(10, 6))
+    sns.scatterplot(x="ph", y="Hardness", hue="Potability", data=data, palette="Set1")
+    plt.title("Scatter Plot: pH vs Hardness by Potability", fontsize=16)
+    plt.xlabel("pH")
+    plt.ylabel("Hardness")
+    plt.tight_layout()
+
+
+# --- Large-data variants: sampled scatter, binned densities ---
+def class_densities(data: pd.DataFrame, column: str, grid_size: int) -> list:
+    """FFT KDE of ``column`` per Potability class, scaled by class share (common_norm)."""
+    values = data[column].to_numpy(dtype=np.float64)
+    low, high = finite_range(values)
+    pad = 0.1 * (high - low)
     if "Potability" not in data.columns:
-        raise KeyError("The dataset must contain a 'Potability' column for evaluation visualization.")
+        return [(None, *fft_kde(values, grid_size, limits=(low - pad, high + pad)))]
+    labels = data["Potability"].to_numpy()
+    densities = []
+    for label in np.unique(labels[~pd.isnull(labels)]):
+        members = labels == label
+        grid, density = fft_kde(values[members], grid_size, limits=(low - pad, high + pad))
+        densities.append((label, grid, density * members.mean()))
+    return densities
+
+
+def scatter_sample(data: pd.DataFrame, row_budget: int) -> pd.DataFrame:
+    if "Potability" in data.columns:
+        return stratified_sample(data, "Potability", row_budget)
+    return data.sample(min(row_budget, len(data)), random_state=42)
+
+
+def plot_pairplot_large(data: pd.DataFrame, row_budget: int, hist_bins: int, kde_grid: int):
+    """Pairplot with KDE diagonals, 2D histograms (all rows) below and a sampled scatter above."""
+    features = [c for c in data.columns if c != "Potability"]
+    sample = scatter_sample(data, row_budget)
+    colors = sns.color_palette(n_colors=max(2, data["Potability"].nunique() if "Potability" in data else 1))
+    hue = sample["Potability"].astype(int).to_numpy() if "Potability" in sample else np.zeros(len(sample), int)
+
+    n = len(features)
+    fig, axes = plt.subplots(n, n, figsize=(2.5 * n, 2.5 * n), squeeze=False)
+    for i, y_column in enumerate(features):
+        for j, x_column in enumerate(features):
+            ax = axes[i, j]
+            if i == j:
+                for k, (label, grid, density) in enumerate(class_densities(data, x_column, kde_grid)):
+                    ax.fill_between(grid, density, color=colors[k], alpha=0.3)
+                    ax.plot(grid, density, color=colors[k], linewidth=1, label=label)
+            elif i > j:
+                counts, x_edges, y_edges = histogram2d(
+                    data[x_column].to_numpy(dtype=np.float64), data[y_column].to_numpy(dtype=np.float64), hist_bins
+                )
+                ax.pcolormesh(x_edges, y_edges, np.log1p(counts.T), cmap="viridis")
+            else:
+                # Markers of a Line2D take Agg's fast path, unlike a scatter collection
+                for k in np.unique(hue):
+                    members = hue == k
+                    ax.plot(sample[x_column].to_numpy()[members], sample[y_column].to_numpy()[members],
+                            ".", color=colors[k], markersize=1, alpha=0.5)
+            if i == n - 1:
+                ax.set_xlabel(x_column)
+            if j == 0:
+                ax.set_ylabel(y_column)
+    fig.suptitle(
+        f"Pairwise Relationships Between Features ({len(data):,} rows; scatter: stratified sample of {len(sample):,})",
+        fontsize=16,
+    )
+    fig.tight_layout(rect=(0, 0, 1, 0.98))
+
+
+def plot_kde_large(data: pd.DataFrame, column: str, kde_grid: int):
+    plt.figure(figsize=(8, 4))
+    for k, (label, grid, density) in enumerate(class_densities(data, column, kde_grid)):
+        color = sns.color_palette()[k]
+        plt.fill_between(grid, density, color=color, alpha=0.25)
+        plt.plot(grid, density, color=color, label=str(label))
+    plt.legend(title="Potability")
+    plt.title(f"Distribution of {column} by Potability", fontsize=14)
+    plt.xlabel(column)
+    plt.ylabel("Density")
+    plt.tight_layout()
+
 
-    X_test = data.drop(columns=["Potability"])
-    y_true = data["Potability"].dropna()
-    X_test = X_test.loc[y_true.index]
+def plot_scatter_ph_hardness_large(data: pd.DataFrame, row_budget: int):
+    sample = scatter_sample(data, row_budget)
+    plt.figure(figsize=(10, 6))
+    sns.scatterplot(x="ph", y="Hardness", hue="Potability", data=sample, palette="Set1", s=8, linewidth=0)
+    plt.title(f"Scatter Plot: pH vs Hardness by Potability (stratified sample of {len(sample):,})", fontsize=16)
+    plt.xlabel("pH")
+    plt.ylabel("Hardness")
+    plt.tight_layout()
 
-    y_pred = model.predict(X_test)
 
-    # Actual vs Predicted Comparison
+def plot_actual_vs_predicted(results: pd.DataFrame, row_budget: int = None):
+    index = np.arange(len(results))
+    if row_budget is not None and len(results) > row_budget:
+        # Evenly spaced rows keep the sample index axis meaningful
+        index = np.linspace(0, len(results) - 1, row_budget).astype(int)
     plt.figure(figsize=(8, 5))
-    plt.scatter(range(len(y_true)), y_true, color="blue", label="Actual", alpha=0.6)
-    plt.scatter(range(len(y_pred)), y_pred, color="red", label="Predicted", alpha=0.6)
+    plt.scatter(index, results["actual"].to_numpy()[index], color="blue", label="Actual", alpha=0.6)
+    plt.scatter(index, results["predicted"].to_numpy()[index], color="red", label="Predicted", alpha=0.6)
     plt.title("Actual vs Predicted Potability", fontsize=16)
     plt.xlabel("Sample Index")
     plt.ylabel("Potability")
     plt.legend()
     plt.tight_layout()
-    plt.savefig(os.path.join(FIG_DIR, "actual_vs_predicted.png"))
-    plt.close()
 
-    # Confusion Matrix
-    cm = confusion_matrix(y_true, y_pred)
+
+def plot_confusion_matrix(results: pd.DataFrame):
+    cm = confusion_matrix(results["actual"], results["predicted"])
     disp = ConfusionMatrixDisplay(confusion_matrix=cm, display_labels=["Not Potable", "Potable"])
     disp.plot(cmap="Blues")
     plt.title("Confusion Matrix", fontsize=16)
     plt.tight_layout()
-    plt.savefig(os.path.join(FIG_DIR, "confusion_matrix.png"))
-    plt.close()
 
-    # Evaluation Metrics Visualization
+
+def plot_metrics(results: pd.DataFrame, metrics: dict):
+    plt.figure(figsize=(8, 5))
+    sns.barplot(x=list(metrics.keys()), y=list(metrics.values()), palette="viridis")
+    plt.title("Model Evaluation Metrics", fontsize=16)
+    plt.ylabel("Score")
+    plt.ylim(0, 1)
+    plt.tight_layout()
+
+
+# === Figure Jobs ===
+def use_large_data(params: dict, n_rows: int) -> bool:
+    """Large-data mode: forced on/off, or "auto" above the row budget."""
+    mode = params.get("large_data", "auto")
+    return n_rows > params.get("row_budget", 100000) if mode == "auto" else bool(mode)
+
+
+def basic_visuals(data: pd.DataFrame, params: dict = None) -> list:
+    """Figure jobs for the basic dataset visualizations."""
+    params = params or {}
+    large = use_large_data(params, len(data))
+    budget = params.get("row_budget", 100000)
+    kde_grid = params.get("kde_grid", 512)
+    numeric = list(data.select_dtypes(include=[np.number]).columns)
+    # Slowest first, so the pool is not left waiting on it at the end
+    if large:
+        pairplot = FigureJob(
+            "pairplot", plot_pairplot_large,
+            params={"row_budget": budget, "hist_bins": params.get("hist_bins", 60), "kde_grid": kde_grid},
+        )
+    else:
+        pairplot = FigureJob("pairplot", plot_pairplot)
+    jobs = [
+        pairplot,
+        FigureJob("histograms", plot_histograms),
+        FigureJob("correlation_heatmap", plot_heatmap),
+    ]
+    jobs += [FigureJob(f"boxplot_{c}", plot_boxplot, columns=[c], params={"column": c}) for c in numeric]
+
+    # KDE plots (distribution by Potability)
+    if "Potability" in data.columns:
+        jobs += [
+            FigureJob(f"kde_{c}", plot_kde_large, columns=list(dict.fromkeys([c, "Potability"])),
+                      params={"column": c, "kde_grid": kde_grid})
+            if large else
+            FigureJob(f"kde_{c}", plot_kde, columns=list(dict.fromkeys([c, "Potability"])), params={"column": c})
+            for c in numeric
+        ]
+
+    # Scatter Plot between pH and Hardness
+    if all(col in data.columns for col in ["ph", "Hardness", "Potability"]):
+        columns = ["ph", "Hardness", "Potability"]
+        if large:
+            jobs.append(FigureJob("scatter_ph_hardness", plot_scatter_ph_hardness_large, columns=columns,
+                                  params={"row_budget": budget}))
+        else:
+            jobs.append(FigureJob("scatter_ph_hardness", plot_scatter_ph_hardness, columns=columns))
+    return jobs
+
+
+def evaluation_results(predictions: pd.DataFrame) -> pd.DataFrame:
+    """Actual and predicted labels of the labelled test rows."""
+    if "Potability" not in predictions.columns:
+        raise KeyError("The predictions must contain a 'Potability' column for evaluation visualization.")
+
+    labelled = predictions.dropna(subset=["Potability"])
+    return pd.DataFrame({"actual": labelled["Potability"].to_numpy(), "predicted": labelled["prediction"].to_numpy()})
+
+
+def evaluation_visuals(params: dict = None, n_rows: int = 0) -> list:
+    """Figure jobs visualizing model performance (actual vs predicted and metrics)."""
+    params = params or {}
+    large = use_large_data(params, n_rows)
     try:
         with open("reports/eval_metrics.json", "r") as f:
             metrics = json.load(f)
     except Exception as e:
         raise Exception(f"Error loading eval_metrics.json: {e}")
 
-    metric_names = list(metrics.keys())
-    metric_values = list(metrics.values())
+    return [
+        FigureJob("actual_vs_predicted", plot_actual_vs_predicted, frame="evaluation",
+                  params={"row_budget": params.get("row_budget", 100000)} if large else {}),
+        FigureJob("confusion_matrix", plot_confusion_matrix, frame="evaluation"),
+        FigureJob("evaluation_metrics", plot_metrics, frame="evaluation", columns=[], params={"metrics": metrics}),
+    ]
 
-    plt.figure(figsize=(8, 5))
-    sns.barplot(x=metric_names, y=metric_values, palette="viridis")
-    plt.title("Model Evaluation Metrics", fontsize=16)
-    plt.ylabel("Score")
-    plt.ylim(0, 1)
-    plt.tight_layout()
-    plt.savefig(os.path.join(FIG_DIR, "evaluation_metrics.png"))
-    plt.close()
+
+def load_params(param_path: str) -> dict:
+    try:
+        with open(param_path) as f:
+            params = yaml.safe_load(f)
+        return params.get("visualization", {})
+    except Exception as e:
+        raise Exception(f"Error loading parameters from {param_path}: {e}")
 
 
 # === Main Function ===
 def main():
     try:
+        params = load_params("params.yaml")
+
         # Paths
-        model_path = os.path.join("models", "rf_model.pkl")
-        test_path = os.path.join("data", "preprocessing", "test_processed.csv")
+        test_path = dataset_path(os.path.join("data", "preprocessing"), "test_processed")
+        predictions_path = dataset_path(os.path.join("data", "evaluation"), "test_predictions")
 
-        # Load Data and Model
+        # Load Data and the evaluation stage's predictions (no model inference here)
         data = load_data(test_path)
-        model = load_model(model_path)
-
-        # Generate Visuals
-        print("Generating basic data visualizations...")
-        basic_visuals(data)
-
-        print("Generating evaluation visualizations...")
-        evaluation_visuals(model, data)
-
+        frames = {"data": data, "evaluation": evaluation_results(load_predictions(predictions_path))}
+
+        # Render every figure whose inputs changed, in parallel
+        print("Rendering data and evaluation visualizations...")
+        started = time.perf_counter()
+        if use_large_data(params, len(data)):
+            print(f"{len(data):,} rows exceed the row budget; sampling scatter panels and binning densities.")
+        jobs = basic_visuals(data, params) + evaluation_visuals(params, len(data))
+        manifest = render_figures(jobs, frames, FIG_DIR, n_jobs=params.get("n_jobs", -1))
+
+        for name, entry in sorted(manifest.items(), key=lambda item: -item[1]["seconds"]):
+            print(f"  {name:32s} {entry['status']:8s} {entry['seconds']:.3f}s")
+        rendered = sum(entry["status"] == "rendered" for entry in manifest.values())
+        print(f"{rendered} of {len(manifest)} figures rendered in {time.perf_counter() - started:.1f}s")
         print(f"All visualizations saved in: {FIG_DIR}")
 
     except Exception as e:
@@ -172,4 +325,4 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -1,34 +1,42 @@
 import streamlit as st
-import pandas as pd
-import pickle
 import numpy as np
 from pathlib import Path
 
+from src.models.forest_format import DEFAULT_DECISION_THRESHOLD, decision_threshold, load_artifact, threshold_predictions
+
 # ==============================================================
 # Model Loading
 # ==============================================================
 @st.cache_resource
 def load_model():
-    """Load the trained model from a pickle file."""
+    """Load the trained model, preferring the memory-mapped forest export."""
     try:
-        # Try loading from the models directory (standard structure)
-        model_path = Path("models/rf_model.pkl")
-        
-        if not model_path.exists():
-            # Try loading from root if running in a different context
-            model_path = Path("rf_model.pkl")
-
-        if not model_path.exists():
+        # Try the models directory (standard structure), then the root if
+        # running in a different context; compressed and full flat forests
+        # first, then the pickle
+        candidates = [
+            Path("models/rf_served"),
+            Path("models/rf_forest"),
+            Path("models/rf_model.pkl"),
+            Path("rf_served"),
+            Path("rf_forest"),
+            Path("rf_model.pkl"),
+        ]
+        model_path = next((path for path in candidates if path.exists()), None)
+
+        if model_path is None:
              st.error("❌ Model file not found. Please ensure 'models/rf_model.pkl' exists.")
              return None, None
 
-        with open(model_path, "rb") as file:
-            model = pickle.load(file)
+        # A pickled forest is flattened too, so predictions take bare arrays
+        model = load_artifact(str(model_path), vectorized=True)
 
         model_info = {
             "model_path": str(model_path),
             "model_type": "Random Forest Classifier",
             "target": "Water Potability",
+            # Same decision threshold as the API (stored with the model)
+            "decision_threshold": decision_threshold(model, DEFAULT_DECISION_THRESHOLD),
         }
         return model, model_info
 
@@ -38,6 +46,10 @@ def load_model():
 
 model, model_info = load_model()
 
+# Expected order: ph, Hardness, Solids, Chloramines, Sulfate, Conductivity, Organic_carbon, Trihalomethanes, Turbidity
+FEATURES = ["ph", "Hardness", "Solids", "Chloramines", "Sulfate", "Conductivity", "Organic_carbon", "Trihalomethanes", "Turbidity"]
+feature_order = list(getattr(model, "feature_names_in_", FEATURES))
+
 # ==============================================================
 # Prediction Logic
 # ==============================================================
@@ -47,26 +59,21 @@ def predict_potability(data: dict):
         return {"error": "Model not loaded"}
 
     try:
-        # Prepare input data (ensure order matches model training)
-        # Expected order: ph, Hardness, Solids, Chloramines, Sulfate, Conductivity, Organic_carbon, Trihalomethanes, Turbidity
-        sample = pd.DataFrame([{
-            "ph": data["ph"],
-            "Hardness": data["Hardness"],
-            "Solids": data["Solids"],
-            "Chloramines": data["Chloramines"],
-            "Sulfate": data["Sulfate"],
-            "Conductivity": data["Conductivity"],
-            "Organic_carbon": data["Organic_carbon"],
-            "Trihalomethanes": data["Trihalomethanes"],
-            "Turbidity": data["Turbidity"],
-        }])
+        # Prepare input data in the order the model was trained with
+        # (a one-row float64 array; the flat forest needs no DataFrame)
+        sample = np.empty((1, len(feature_order)), dtype=np.float64)
+        sample[0] = [data[feature] for feature in feature_order]
 
         # Make prediction
-        prediction = model.predict(sample)[0]
+        predictions, probabilities = threshold_predictions(
+            model.predict_proba(sample), model.classes_, model_info["decision_threshold"]
+        )
+        prediction = int(predictions[0])
         result_text = "Water is Consumable" if prediction == 1 else "Water is Not Consumable"
         
         return {
-            "prediction": int(prediction),
+            "prediction": prediction,
+            "probability": float(probabilities[0]),
             "result": result_text
         }
 